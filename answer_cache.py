@@ -0,0 +1,212 @@
+import asyncio
+import functools
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_NEGATIVE_TTL = 300
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_WRITE_BATCH = 32
+DEFAULT_WRITE_INTERVAL = 5.0  # detik
+ENTRY_OVERHEAD = 200  # perkiraan kasar overhead tuple + OrderedDict per entri
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Fold case, punctuation and whitespace so trivially different questions share a key."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = _PUNCTUATION.sub(" ", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class SearchUnavailable(Exception):
+    """Raised by a cached search when the upstream failed, as opposed to finding nothing."""
+
+
+class AnswerCache:
+    """LRU + TTL cache for web search answers, optionally backed by SQLite.
+
+    ``None`` answers are cached too, but only for ``negative_ttl`` seconds.
+    A search that raises :class:`SearchUnavailable` (timeout, transport
+    error) returns ``None`` without touching the cache.
+
+    Writes to SQLite are batched: :meth:`set` only updates memory and
+    queues the row, and every ``write_batch`` rows or ``write_interval``
+    seconds :meth:`flush` commits the queue in the default executor. A crash
+    loses at most that much of the cache.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 write_batch=DEFAULT_WRITE_BATCH, write_interval=DEFAULT_WRITE_INTERVAL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.write_batch = write_batch
+        self.write_interval = write_interval
+        self.size_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0, "expired": 0, "evictions": 0,
+                      "unavailable": 0}
+        self._entries = OrderedDict()
+        self._db = None
+        self._pending = {}  # key -> (answer, expires_at), None = hapus
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._last_write = time.monotonic()
+        self._flushing = None
+        if path:
+            self.open(path)
+
+    def open(self, path) -> None:
+        """Back the cache with the SQLite file at ``path`` and load its live entries (blocking)."""
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, answer TEXT, expires_at REAL NOT NULL)"
+            )
+            now = time.time()
+            self._db.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT key, answer, expires_at FROM answers ORDER BY expires_at DESC LIMIT ?",
+                (self.max_entries,),
+            ).fetchall()
+            for key, answer, expires_at in reversed(rows):
+                self._store(key, answer, expires_at)
+            logger.info(f"Cache jawaban dimuat dari {path}: {len(self._entries)} entri")
+        except sqlite3.Error as e:
+            logger.error(f"Kesalahan membuka cache jawaban {path}: {e}")
+            self._db = None
+
+    def flush(self) -> None:
+        """Commit queued writes in one transaction (blocking)."""
+        with self._write_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+            self._last_write = time.monotonic()
+            if not batch or self._db is None:
+                return
+            try:
+                with self._db:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO answers (key, answer, expires_at) VALUES (?, ?, ?)",
+                        [(key, entry[0], entry[1]) for key, entry in batch.items() if entry is not None],
+                    )
+                    self._db.executemany("DELETE FROM answers WHERE key = ?",
+                                         [(key,) for key, entry in batch.items() if entry is None])
+            except sqlite3.Error as e:
+                logger.error(f"Kesalahan menyimpan cache jawaban: {e}")
+
+    def _flush_soon(self) -> None:
+        if self._flushing is not None and not self._flushing.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # tanpa event loop (skrip): langsung saja
+            return
+        self._flushing = loop.run_in_executor(None, self.flush)
+
+    def close(self) -> None:
+        self.flush()
+        with self._write_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @staticmethod
+    def make_key(namespace: str, query: str) -> str:
+        return f"{namespace}:{normalize_query(query)}"
+
+    def get(self, namespace: str, query: str, default=None):
+        key = self.make_key(namespace, query)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return default
+        answer, expires_at = entry
+        if expires_at <= time.time():
+            self._discard(key)
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return default
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        if answer is None:
+            self.stats["negative_hits"] += 1
+        return answer
+
+    def set(self, namespace: str, query: str, answer) -> None:
+        key = self.make_key(namespace, query)
+        expires_at = time.time() + (self.ttl if answer is not None else self.negative_ttl)
+        evicted = self._store(key, answer, expires_at)
+        if self._db is None:
+            return
+        with self._pending_lock:
+            self._pending[key] = (answer, expires_at)
+            for old in evicted:
+                self._pending[old] = None
+            pending = len(self._pending)
+        if pending >= self.write_batch or time.monotonic() - self._last_write >= self.write_interval:
+            self._flush_soon()
+
+    def _store(self, key, answer, expires_at):
+        self._discard(key)
+        self._entries[key] = (answer, expires_at)
+        self.size_bytes += _entry_size(key, answer)
+        evicted = []
+        while self._entries and (len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            evicted.append(oldest)
+            self.stats["evictions"] += 1
+        return evicted
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= _entry_size(key, entry[0])
+
+    def cached(self, namespace: str):
+        """Decorate ``async def search(query) -> str | None`` with this cache.
+
+        ``None`` means the upstream answered with no result; transient
+        failures must raise :class:`SearchUnavailable` instead.
+        """
+        missing = object()
+
+        def decorator(search):
+            @functools.wraps(search)
+            async def wrapper(query: str):
+                answer = self.get(namespace, query, missing)
+                if answer is not missing:
+                    return answer
+                try:
+                    answer = await search(query)
+                except SearchUnavailable as e:
+                    # Gangguan sesaat bukan "tidak ada hasil": jangan disimpan sebagai jawaban negatif.
+                    self.stats["unavailable"] += 1
+                    logger.error(str(e))
+                    return None
+                self.set(namespace, query, answer)
+                return answer
+            return wrapper
+        return decorator
+
+
+def _entry_size(key, answer):
+    return ENTRY_OVERHEAD + len(key) + (len(answer) if answer else 0)
@@ -2,19 +2,39 @@ import logging
 import os
 import json
 import httpx
-from gtts import gTTS
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
 from dotenv import load_dotenv
-import re
-from bs4 import BeautifulSoup
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.linear_model import LogisticRegression
-import pickle
+import startup
+from trainer import BackgroundTrainer
+import model_artifacts
+from model_registry import ModelRegistry, load_golden_set
+from inference import LocalInference
+from answer_cache import AnswerCache, SearchUnavailable, normalize_query
+from search_engine import FanOutSearch, SearchProvider
+import http_client
+from voice_cache import VoiceCache
+from content_filter import ContentFilter
+from intent_router import IntentRouter
+from training_log import TrainingLog
+from tts_pipeline import TTSPipeline
+from arithmetic import CalculationError, evaluate
+from chat_scheduler import ChatScheduler
+from reply_composer import ReplyComposer
+from single_flight import SingleFlight
+from provider_health import CircuitOpen, ProviderHealth
+from search_budget import EXHAUSTED, NORMAL, BudgetExhausted, SearchBudget, from_reserve
+from rate_limiter import PRIORITY_COMMAND, RATE_LIMIT_GLOBAL, TelegramRateLimiter, with_priority
+import webhook
+from webhook import WebhookApp
+import sharding
+from persistence import SQLitePersistence
 import asyncio
 import random
 
+bs4 = startup.lazy_import("bs4")
+startup.checkpoint("impor modul")
+
 load_dotenv()
 
 # Constants
@@ -23,75 +43,81 @@ HELP_TEXT = "/start - Memulai percakapan\n/help - Menampilkan daftar perintah\n/
 ABOUT_BOT = "Saya adalah bot yang dirancang untuk membantu Anda dengan berbagai pertanyaan. 🤖"
 ABOUT_CREATOR = "Saya dibuat oleh Welli Ardiansyah."
 FILTER_WORDS_FILE = "filtered_words.json"
-RESPONSE_MODEL_FILE = "responses.json"
 TRAINING_DATA_FILE = "training_data.json"
+TRAINING_LOG_FILE = "training_data.jsonl"
+INTENTS_FILE = "intents.json"
 BING_API_KEY = os.getenv("BING_API_KEY")
+BING_ENDPOINT = os.getenv("BING_ENDPOINT", "https://api.bing.microsoft.com/v7.0/search")
+WIKIPEDIA_ENDPOINT = os.getenv("WIKIPEDIA_ENDPOINT", "https://id.wikipedia.org/w/api.php")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # polling | webhook
+INFERENCE_THRESHOLD = float(os.getenv("INFERENCE_THRESHOLD", "0.6"))
+INFERENCE_LATENCY_BUDGET_MS = float(os.getenv("INFERENCE_LATENCY_BUDGET_MS", "5"))
+ANSWER_CACHE_FILE = os.getenv("ANSWER_CACHE_FILE", "answer_cache.db")
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "5"))
+SEARCH_HEDGE_AFTER = float(os.getenv("SEARCH_HEDGE_AFTER", "1.5"))
+FILTER_WORD_BOUNDARY = os.getenv("FILTER_WORD_BOUNDARY", "0") == "1"
 
 # Logging setup
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global variables
-responses = {}
 filter_words = []
 user_context = {}
-training_data = []
 models = {}
 vectorizers = {}
+model_version = 0
+model_loading = None  # tugas pemuatan model pertama, berjalan di latar belakang
+background_tasks = []  # pelatihan berkala dan prerender suara; dibatalkan di on_shutdown
+# Proses anak (spawn) mengimpor ulang modul ini: berkas dan basis data baru dibuka di on_startup.
+answer_cache = AnswerCache(ttl=ANSWER_CACHE_TTL)
+voice_cache = VoiceCache()
+tts_pipeline = TTSPipeline(voice_cache)
+reply_composer = ReplyComposer(tts_pipeline)
+# Batas global Telegram berlaku per bot, jadi dibagi rata antar shard; chat selalu di satu shard.
+rate_limiter = TelegramRateLimiter(global_rate=RATE_LIMIT_GLOBAL / sharding.SHARD_COUNT)
+chat_scheduler = ChatScheduler(pressure=[http_client.saturated, tts_pipeline.saturated, rate_limiter.saturated])
 
 def get_current_time_indonesia():
     indonesian_timezone = pytz.timezone('Asia/Jakarta')
     return datetime.now(indonesian_timezone).strftime('%Y-%m-%d %H:%M:%S')
 
-def load_responses():
-    if os.path.exists(RESPONSE_MODEL_FILE):
-        with open(RESPONSE_MODEL_FILE, "r", encoding='utf-8') as f:
-            data = f.read().strip()
-            return json.loads(data) if data else {}
-    return {}
-
 def load_filter_words():
     if os.path.exists(FILTER_WORDS_FILE):
         with open(FILTER_WORDS_FILE, "r", encoding='utf-8') as f:
             return json.load(f)
     return []
 
-def load_training_data():
-    if os.path.exists(TRAINING_DATA_FILE):
-        with open(TRAINING_DATA_FILE, "r", encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-responses = load_responses()
 filter_words = load_filter_words()
-training_data = load_training_data()
-
-def save_training_data():
-    with open(TRAINING_DATA_FILE, "w", encoding='utf-8') as f:
-        json.dump(training_data, f, ensure_ascii=False, indent=4)
+training_log = TrainingLog(TRAINING_LOG_FILE)
+content_filter = ContentFilter(filter_words, word_boundary=FILTER_WORD_BOUNDARY)
 
 # Helper functions
 def contains_filtered_words(text: str) -> bool:
-    return any(word in text for word in filter_words)
+    return content_filter.contains(text)
 
 async def calculate(expression: str) -> str:
     try:
-        expression = re.sub(r'[^\d+\-*/().]', '', expression)
-        result = eval(expression)
-        return str(result)
-    except Exception as e:
+        return str(evaluate(expression))
+    except CalculationError as e:
         logger.error(f"Kesalahan menghitung ekspresi: {e}")
         return "Maaf, saya tidak dapat menghitung itu. Pastikan input Anda benar."
 
 async def fetch_with_httpx(endpoint: str, params: dict, headers: dict, timeout: int = 5) -> dict:
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(endpoint, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+    return await http_client.fetch_json(endpoint, params=params, headers=headers, timeout=timeout)
+
+# Breaker per penyedia; timeout mengikuti p95 latensi yang teramati.
+bing_health = ProviderHealth("bing")
+wikipedia_health = ProviderHealth("wikipedia")
+if not BING_API_KEY:
+    bing_health.disable("BING_API_KEY tidak diisi")
+bing_budget = SearchBudget()
 
+@answer_cache.cached("bing")
 async def search_bing(query: str) -> str:
-    endpoint = "https://api.bing.microsoft.com/v7.0/search"
+    endpoint = BING_ENDPOINT
     headers = {"Ocp-Apim-Subscription-Key": BING_API_KEY}
     params = {
         "q": query,
@@ -100,21 +126,30 @@ async def search_bing(query: str) -> str:
         "setLang": "id"
     }
 
+    # Kuota diklaim di executor; breaker dicek ulang sesudahnya karena klaim memakai await.
+    if bing_health.available:
+        if not await bing_budget.claim_async():
+            raise BudgetExhausted("Kuota Bing habis")
+        if not bing_health.available:
+            await bing_budget.refund_async()  # permintaan tidak akan dikirim
     try:
-        search_results = await fetch_with_httpx(endpoint, params, headers)
+        search_results = await bing_health.call(fetch_with_httpx, endpoint, params, headers)
         if "webPages" in search_results and "value" in search_results["webPages"]:
             top_result = search_results["webPages"]["value"][0]
             raw_snippet = top_result["snippet"]
-            cleaned_snippet = BeautifulSoup(raw_snippet, "html.parser").get_text()
+            cleaned_snippet = bs4.BeautifulSoup(raw_snippet, "html.parser").get_text()
             return cleaned_snippet
-    except httpx.ReadTimeout:
-        logger.error("Pencarian Bing memakan waktu terlalu lama.")
+    except CircuitOpen:
+        raise  # jangan disimpan sebagai jawaban kosong di cache
+    except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+        raise SearchUnavailable("Pencarian Bing memakan waktu terlalu lama.") from e
     except Exception as e:
-        logger.error(f"Kesalahan pencarian Bing: {e}")
+        raise SearchUnavailable(f"Kesalahan pencarian Bing: {e}") from e
     return None
 
+@answer_cache.cached("wikipedia")
 async def search_wikipedia(query: str) -> str:
-    endpoint = "https://id.wikipedia.org/w/api.php"
+    endpoint = WIKIPEDIA_ENDPOINT
     params = {
         "action": "query",
         "list": "search",
@@ -125,50 +160,95 @@ async def search_wikipedia(query: str) -> str:
     }
 
     try:
-        search_results = await fetch_with_httpx(endpoint, params, {})
+        search_results = await wikipedia_health.call(fetch_with_httpx, endpoint, params, {})
         if "query" in search_results and "search" in search_results["query"]:
             if search_results["query"]["search"]:
                 page_snippet = search_results["query"]["search"][0]["snippet"]
-                cleaned_snippet = BeautifulSoup(page_snippet, 'html.parser').get_text()
+                cleaned_snippet = bs4.BeautifulSoup(page_snippet, 'html.parser').get_text()
                 return cleaned_snippet
-    except httpx.ReadTimeout:
-        logger.error("Pencarian Wikipedia memakan waktu terlalu lama.")
+    except CircuitOpen:
+        raise
+    except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+        raise SearchUnavailable("Pencarian Wikipedia memakan waktu terlalu lama.") from e
     except Exception as e:
-        logger.error(f"Kesalahan pencarian Wikipedia: {e}")
+        raise SearchUnavailable(f"Kesalahan pencarian Wikipedia: {e}") from e
     return None
 
+# Bing lebih diutamakan; hanya Wikipedia (gratis) yang di-hedge.
+wikipedia_provider = SearchProvider("wikipedia", search_wikipedia, deadline=SEARCH_DEADLINE,
+                                    hedge_after=SEARCH_HEDGE_AFTER, health=wikipedia_health)
+web_search = FanOutSearch([
+    SearchProvider("bing", search_bing, deadline=SEARCH_DEADLINE, health=bing_health),
+    wikipedia_provider,
+])
+# Jalur hemat saat anggaran Bing menipis.
+free_search = FanOutSearch([wikipedia_provider])
+
+async def budgeted_search(query: str):
+    plan = await bing_budget.plan_async()
+    if plan == NORMAL:
+        return await web_search.search(query)
+    cached = answer_cache.get("bing", query)
+    if cached:
+        bing_budget.avoided("cache")
+        return cached
+    response = await free_search.search(query)
+    if response:
+        bing_budget.avoided("wikipedia")
+        return response
+    if plan == EXHAUSTED or not bing_health.available:
+        bing_budget.avoided("exhausted")
+        return None
+    # Cadangan kuota: hanya untuk pertanyaan yang tidak terjawab di tingkat mana pun.
+    token = from_reserve.set(True)
+    try:
+        return await search_bing(query)
+    except CircuitOpen:
+        return None
+    finally:
+        from_reserve.reset(token)
+
+# Pertanyaan yang sama dari banyak pengguna sekaligus menunggu satu pencarian yang sama.
+web_lookups = SingleFlight()
+
+def record_learned(user_query: str, response: str) -> None:
+    training_log.append(user_query, response)
+    trainer.submit(user_query, response)
+
 async def update_training_data(user_query: str, response: str):
-    training_data.append({"query": user_query, "response": response})
-    save_training_data()
+    if sharding.owns_training():
+        record_learned(user_query, response)
+    else:
+        sharding.forward_learned(user_query, response)
+
+async def search_and_learn(user_query: str):
+    # Dijalankan sekali per pencarian bersama, jadi pasangan baru juga dicatat sekali.
+    response = await budgeted_search(user_query)
+    if response:
+        await update_training_data(user_query, response)
+    return response
 
 async def train_model():
-    if training_data:
-        vectorizer = TfidfVectorizer()
-        X = vectorizer.fit_transform([data["query"] for data in training_data])
-        y = [data["response"] for data in training_data]
-
-        models = {
-            'naive_bayes': MultinomialNB(),
-            'logistic_regression': LogisticRegression(max_iter=1000)
-        }
-
-        for model_name, model in models.items():
-            model.fit(X, y)
-            with open(f"{model_name}.pkl", "wb") as model_file:
-                pickle.dump(model, model_file)
-            with open(f"{model_name}_vectorizer.pkl", "wb") as vector_file:
-                pickle.dump(vectorizer, vector_file)
-
-async def load_models():
-    global models, vectorizers
-    models = {}
-    vectorizers = {}
-
-    for model_name in ['naive_bayes', 'logistic_regression']:
-        with open(f"{model_name}.pkl", "rb") as model_file:
-            models[model_name] = pickle.load(model_file)
-        with open(f"{model_name}_vectorizer.pkl", "rb") as vector_file:
-            vectorizers[model_name] = pickle.load(vector_file)
+    # Pelatihan berjalan di proses terpisah; di sini hanya meminta batch yang tertunda diterbitkan.
+    trainer.flush()
+
+def activate_models(artifact: model_artifacts.ModelArtifact) -> None:
+    global models, vectorizers, model_version
+    models = artifact.models
+    vectorizers = {model_name: artifact.vectorizer for model_name in artifact.models}
+    model_version = artifact.version
+    local_inference.set_models(model_version, models, vectorizers)
+
+local_inference = LocalInference(INFERENCE_THRESHOLD, INFERENCE_LATENCY_BUDGET_MS)
+model_registry = ModelRegistry(activate_models)  # golden set diisi di on_startup
+trainer = BackgroundTrainer(model_registry.notify)
+
+intent_router = IntentRouter.from_file(INTENTS_FILE, handlers={
+    "calculate": calculate,
+    "about_bot": lambda query: ABOUT_BOT,
+    "about_creator": lambda query: ABOUT_CREATOR,
+})
+startup.checkpoint("inisialisasi global")
 
 def generate_follow_up_question(user_query: str) -> str:
     if "apa" in user_query:
@@ -202,20 +282,8 @@ def generate_custom_topic_suggestions(user_preferences: list) -> list:
     return random.sample([topic for topic in available_topics if topic in user_preferences], 3)
 
 async def send_voice_response(update: Update, text: str) -> None:
-    voice_file = "voice_response.ogg"
-    try:
-        # Cek apakah file sudah ada
-        if not os.path.exists(voice_file):
-            tts = gTTS(text=text, lang='id')
-            tts.save(voice_file)
-
-        with open(voice_file, 'rb') as voice:
-            await update.message.reply_voice(voice=voice)
-    except Exception as e:
-        logger.error(f"Kesalahan mengirim pesan suara: {e}")
-    finally:
-        if os.path.exists(voice_file):
-            os.remove(voice_file) 
+    # Suara dikirim di latar belakang; balasan teks tidak menunggu TTS.
+    tts_pipeline.submit(update.message, text)
 
 async def handle_user_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_query = update.message.text.lower().strip()
@@ -227,51 +295,31 @@ async def handle_user_query(update: Update, context: ContextTypes.DEFAULT_TYPE)
     response = None
 
     # Handle specific queries
-    if re.match(r'^[\d\s+\-*/().]+$', user_query):
-        response = await calculate(user_query)
-    elif "siapa kamu" in user_query or "apa itu" in user_query:
-        response = ABOUT_BOT
-    elif "siapa penciptamu" in user_query or "siapa yang membuatmu" in user_query:
-        response = ABOUT_CREATOR
-    elif "apa kabar" in user_query or "bagaimana kabarmu" in user_query:
-        response = "Saya baik-baik saja, terima kasih! Bagaimana dengan Anda?"
-    elif "cinta" in user_query or "suka" in user_query:
-        response = "Cinta adalah emosi yang mendalam. Apakah Anda memiliki pengalaman yang ingin dibagikan?"
-    elif "musik" in user_query:
-        response = "Musik adalah bagian penting dari budaya kita. Jenis musik apa yang Anda suka?"
-    elif "film" in user_query:
-        response = "Film bisa menjadi pengalaman yang menghibur. Apa film terakhir yang Anda tonton?"
-    elif "cuaca" in user_query:
-        response = "Cuaca bisa sangat berpengaruh pada suasana hati. Anda ingin tahu tentang cuaca di mana?"
-    elif "makanan" in user_query:
-        response = "Makanan adalah bagian penting dari kehidupan. Apa makanan favorit Anda?"
-    elif "teknologi" in user_query:
-        response = "Teknologi terus berkembang. Apa yang terbaru yang Anda dengar?"
+    intent = intent_router.route(user_query)
+    if intent is not None:
+        response = await intent_router.dispatch(intent, user_query)
+    elif (prediction := local_inference.predict(user_query)):
+        response = prediction[0]
     else:
-        bing_response = await search_bing(user_query)
-        wiki_response = await search_wikipedia(user_query)
-        response = bing_response or wiki_response
+        response = await web_lookups.do(normalize_query(user_query), search_and_learn, user_query)
 
-        if response:
-            await update_training_data(user_query, response)
-            await train_model()  # Train the model with new data
-        else:
+        if not response:
             response = "Maaf, saya tidak tahu jawaban untuk itu. Bisakah Anda memberi tahu saya lebih lanjut?"
 
-    await update.message.reply_text(f"\n{response}")
-    await send_voice_response(update, response)  # Kirim suara untuk response
-    follow_up_question = generate_follow_up_question(user_query)
-    if follow_up_question:
-        await update.message.reply_text(follow_up_question)
+    # Jawaban, pertanyaan lanjutan dan saran topik dikirim sekaligus; suara diproses paralel.
+    async with reply_composer.compose(update.message) as reply:
+        reply.text(response)
+        reply.voice(response)  # Kirim suara untuk response
+        reply.text(generate_follow_up_question(user_query))
 
-    # Get user preferences from context
-    user_preferences = context.user_data.get('preferences', [])
-    if user_preferences:
-        topic_suggestions = generate_custom_topic_suggestions(user_preferences)
-    else:
-        topic_suggestions = generate_topic_suggestions()
-        
-    await update.message.reply_text(f"Coba diskusikan topik ini: {', '.join(topic_suggestions)}")
+        # Get user preferences from context
+        user_preferences = context.user_data.get('preferences', [])
+        if user_preferences:
+            topic_suggestions = generate_custom_topic_suggestions(user_preferences)
+        else:
+            topic_suggestions = generate_topic_suggestions()
+
+        reply.text(f"Coba diskusikan topik ini: {', '.join(topic_suggestions)}")
 
 async def handle_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     feedback = update.message.text.lower().strip()
@@ -304,7 +352,7 @@ async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     await send_voice_response(update, ABOUT_BOT)
 
 async def suggest_topics(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    topics = [data["query"] for data in training_data]
+    topics = await asyncio.get_running_loop().run_in_executor(None, training_log.topics)
     if topics:
         await update.message.reply_text("Topik yang sudah dibahas: " + ", ".join(topics))
     else:
@@ -314,28 +362,99 @@ async def periodic_training():
     while True:
         await asyncio.sleep(3600)  # Wait for an hour
         await train_model()
-
-def main() -> None:
-    global models, vectorizers
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
-
-    # Load models
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(load_models())
+        await asyncio.get_running_loop().run_in_executor(None, training_log.compact)
+
+def migrate_training_log() -> None:
+    if sharding.owns_training():
+        training_log.migrate_from_json(TRAINING_DATA_FILE)
+
+async def on_startup(application) -> None:
+    with startup.phase("klien http"):
+        await http_client.start(application)
+    loaded = await startup.load_parallel({
+        "cache jawaban": lambda: answer_cache.open(ANSWER_CACHE_FILE),
+        "cache suara": voice_cache.open,
+        "log pelatihan": migrate_training_log,
+        "golden set": lambda: load_golden_set(fallback_log=TRAINING_LOG_FILE),
+    })
+    model_registry.golden = loaded["golden set"]
+    # Model (dan sklearn) dimuat di latar belakang; sampai siap, pertanyaan jatuh ke pencarian web.
+    global model_loading
+    model_loading = asyncio.create_task(model_registry.start())
+    if sharding.owns_training():
+        trainer.start(bootstrap_path=TRAINING_LOG_FILE)
+        sharding.start_learned_listener(record_learned)
+        background_tasks.append(asyncio.create_task(periodic_training()))
+    tts_pipeline.start()
+    background_tasks.append(asyncio.create_task(
+        voice_cache.prerender([WELCOME_TEXT, HELP_TEXT, ABOUT_BOT], tts_pipeline.executor)))
+    startup.preload(bs4)
+    startup.mark_ready()
+
+async def on_shutdown(application) -> None:
+    startup.clear_ready()
+    await chat_scheduler.stop()
+    # Pelatihan berkala memakai trainer dan training_log: hentikan sebelum keduanya ditutup.
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    trainer.stop()
+    if model_loading is not None and not model_loading.done():
+        model_loading.cancel()
+        await asyncio.gather(model_loading, return_exceptions=True)
+    await model_registry.stop()
+    await tts_pipeline.stop()
+    training_log.close()
+    await http_client.stop(application)
+    logger.info(f"Statistik cache jawaban: {answer_cache.stats}")
+    logger.info(f"Statistik pencarian web: {web_search.stats}")
+    logger.info(f"Statistik penggabungan pencarian: {web_lookups.stats}")
+    logger.info(f"Statistik penyedia: bing {bing_health.stats}, wikipedia {wikipedia_health.stats}")
+    logger.info(f"Anggaran Bing: {await asyncio.get_running_loop().run_in_executor(None, bing_budget.report)}")
+    logger.info(f"Statistik cache suara: {voice_cache.stats}")
+    logger.info(f"Statistik TTS: {tts_pipeline.stats}")
+    logger.info(f"Statistik intent: {dict(intent_router.stats)}")
+    logger.info(f"Statistik model: {model_registry.stats}")
+    logger.info(f"Statistik penjadwal chat: {chat_scheduler.stats}")
+    logger.info(f"Statistik penyusun balasan: {reply_composer.stats}")
+    answer_cache.close()
+    bing_budget.close()
+    voice_cache.close()
+
+def build_application(request=None):
+    builder = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .persistence(SQLitePersistence())
+        .rate_limiter(rate_limiter)
+    )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
 
     # Set up handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("about", about_command))
-    application.add_handler(CommandHandler("feedback", handle_feedback))
-    application.add_handler(CommandHandler("topics", suggest_topics))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_user_query))
+    application.add_handler(CommandHandler("start", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, start))))
+    application.add_handler(CommandHandler("help", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, help_command))))
+    application.add_handler(CommandHandler("about", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, about_command))))
+    application.add_handler(CommandHandler("feedback", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, handle_feedback))))
+    application.add_handler(CommandHandler("topics", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, suggest_topics))))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, chat_scheduler.wrap(handle_user_query)))
 
-    # Create periodic training task
-    loop.create_task(periodic_training())
+    return application
 
-    application.run_polling()
+webhook_app = WebhookApp(build_application)
+
+def main() -> None:
+    shards = sharding.shard_count(BOT_MODE)
+    if shards > 1:
+        sharding.run(build_application, TELEGRAM_BOT_TOKEN, shards=shards, mode=BOT_MODE)
+    elif BOT_MODE == "webhook":
+        webhook.serve(webhook_app, TELEGRAM_BOT_TOKEN)
+    else:
+        build_application().run_polling()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,191 @@
+import math
+import operator
+import re
+from functools import lru_cache
+
+MAX_EXPRESSION_LENGTH = 256
+MAX_NUMBER_DIGITS = 32
+MAX_RESULT_BITS = 4096  # hasil bilangan bulat sampai ~1233 digit desimal
+MAX_STEPS = 128
+
+_ALLOWED = re.compile(r"[\d+\-*/().]*")
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"(\d+\.?\d*|\.\d+)|(\*\*|//|[-+*/()])|(\S)")
+
+# Operator biner: (presedensi, asosiatif kanan)
+_BINARY = {"+": (1, False), "-": (1, False), "*": (2, False), "/": (2, False), "//": (2, False),
+           "**": (4, True)}
+_UNARY = {"-": "neg", "+": "pos"}
+_UNARY_PRECEDENCE = 3  # di bawah **, jadi -2**2 == -4 seperti di Python
+_PRECEDENCE = {op: precedence for op, (precedence, _) in _BINARY.items()}
+_PRECEDENCE.update(neg=_UNARY_PRECEDENCE, pos=_UNARY_PRECEDENCE)
+
+
+class CalculationError(ValueError):
+    pass
+
+
+def _check_int(value) -> None:
+    if isinstance(value, int) and value.bit_length() > MAX_RESULT_BITS:
+        raise CalculationError("Hasil terlalu besar")
+
+
+def _multiply(a, b):
+    if isinstance(a, int) and isinstance(b, int) and a.bit_length() + b.bit_length() > MAX_RESULT_BITS + 1:
+        raise CalculationError("Hasil terlalu besar")
+    return a * b
+
+
+def _power(base, exponent):
+    if isinstance(exponent, float) or isinstance(base, float):
+        if base < 0 and not float(exponent).is_integer():
+            raise CalculationError("Pangkat pecahan dari bilangan negatif")
+        return math.pow(base, exponent)
+    if exponent < 0:
+        if base == 0:
+            raise CalculationError("Pembagian dengan nol")
+        return math.pow(base, exponent)
+    # Perkiraan ukuran hasil diperiksa sebelum menghitung, jadi 9**9**9 ditolak seketika.
+    if base not in (0, 1, -1) and (abs(base).bit_length() - 1) * exponent > MAX_RESULT_BITS:
+        raise CalculationError("Hasil terlalu besar")
+    return base ** exponent
+
+
+def _divide(a, b):
+    if b == 0:
+        raise CalculationError("Pembagian dengan nol")
+    return a / b
+
+
+def _floor_divide(a, b):
+    if b == 0:
+        raise CalculationError("Pembagian dengan nol")
+    return a // b
+
+
+_APPLY = {"+": operator.add, "-": operator.sub, "*": _multiply, "/": _divide, "//": _floor_divide,
+          "**": _power}
+
+
+def _number(text: str):
+    if len(text) > MAX_NUMBER_DIGITS:
+        raise CalculationError("Angka terlalu panjang")
+    return float(text) if "." in text else int(text)
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str) -> tuple:
+    """Parse ``expression`` into a postfix program (shunting-yard); cached per string.
+
+    Whitespace is removed first, as the old ``eval`` path did, so ``"2 3"`` is 23.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalculationError("Ekspresi terlalu panjang")
+    expression = _WHITESPACE.sub("", expression)
+    if not _ALLOWED.fullmatch(expression):
+        raise CalculationError("Karakter tidak dikenal")
+
+    program = []
+    stack = []
+    expect_operand = True
+    for number, symbol, unknown in _TOKEN.findall(expression):
+        if unknown:
+            raise CalculationError(f"Karakter tidak dikenal: {unknown}")
+        if number:
+            if not expect_operand:
+                raise CalculationError("Dua angka tanpa operator")
+            program.append(_number(number))
+            expect_operand = False
+        elif symbol == "(":
+            if not expect_operand:
+                raise CalculationError("Kurung buka tidak pada tempatnya")
+            stack.append(symbol)
+        elif symbol == ")":
+            if expect_operand:
+                raise CalculationError("Kurung tutup tidak pada tempatnya")
+            while stack and stack[-1] != "(":
+                program.append(stack.pop())
+            if not stack:
+                raise CalculationError("Kurung tidak seimbang")
+            stack.pop()
+        elif expect_operand:
+            if symbol not in _UNARY:
+                raise CalculationError(f"Operator {symbol} tanpa operand")
+            stack.append(_UNARY[symbol])  # prefiks: tidak mengeluarkan apa pun dari tumpukan
+        else:
+            precedence, right = _BINARY[symbol]
+            while stack and stack[-1] != "(":
+                top = _PRECEDENCE[stack[-1]]
+                if top > precedence or (top == precedence and not right):
+                    program.append(stack.pop())
+                else:
+                    break
+            stack.append(symbol)
+            expect_operand = True
+
+    if expect_operand:
+        raise CalculationError("Ekspresi tidak lengkap")
+    while stack:
+        symbol = stack.pop()
+        if symbol == "(":
+            raise CalculationError("Kurung tidak seimbang")
+        program.append(symbol)
+    if len(program) > MAX_STEPS:
+        raise CalculationError("Ekspresi terlalu rumit")
+    return tuple(program)
+
+
+def evaluate(expression: str):
+    """Evaluate +, -, *, /, //, ** and parentheses over int/float literals.
+
+    Raises CalculationError for invalid input or when a literal, an
+    intermediate result or the step count exceeds its limit.
+    """
+    stack = []
+    push, pop = stack.append, stack.pop
+    try:
+        for step in compile_expression(expression):
+            if step.__class__ is not str:
+                push(step)
+            elif step == "neg":
+                push(-pop())
+            elif step == "pos":
+                pass
+            else:
+                right = pop()
+                push(_APPLY[step](pop(), right))
+    except (OverflowError, ZeroDivisionError) as e:
+        raise CalculationError(str(e)) from None
+    result = stack[0]
+    if isinstance(result, float) and not math.isfinite(result):
+        raise CalculationError("Hasil tidak hingga")
+    _check_int(result)
+    return result
+
+
+if __name__ == "__main__":
+    # Benchmark: python arithmetic.py
+    import timeit
+
+    cases = ["2+2", "12*(3+4)-5/2", "(1.5+2.25)*4-7//2", "-2**2+3**-1", "((((1+2)*3)-4)/5)"]
+    for case in cases:
+        assert evaluate(case) == eval(case), case
+    # Spasi dibuang sebelum dihitung, sama seperti versi eval lama.
+    assert evaluate("2 3") == 23 and evaluate(" 1 000 + 1 ") == 1001 and evaluate("2 * * 3") == 8
+    for case in cases:
+        runs = 200_000
+        elapsed = timeit.timeit(lambda: evaluate(case), number=runs) / runs
+        baseline = timeit.timeit(lambda: eval(case), number=runs // 10) / (runs // 10)
+        print(f"{case:<24} {elapsed * 1e6:6.2f} µs   (eval {baseline * 1e6:6.2f} µs)")
+
+    def reject(text):
+        try:
+            evaluate(text)
+        except CalculationError:
+            return
+        raise AssertionError(text)
+
+    for case in ["9**9**9", "10**10**10**10", "(" * 200 + "1" + ")" * 200, "9" * 5000, "2**4000*2**4000"]:
+        runs = 20_000
+        elapsed = timeit.timeit(lambda: reject(case), number=runs) / runs
+        print(f"{case[:24]:<24} ditolak dalam {elapsed * 1e6:6.2f} µs")
@@ -0,0 +1,122 @@
+import asyncio
+import functools
+import logging
+import os
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CHAT_MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", "32"))
+CHAT_MAX_PENDING = int(os.getenv("CHAT_MAX_PENDING", "1000"))
+BACKPRESSURE_POLL = 0.05  # detik
+
+
+class ChatScheduler:
+    """Runs handlers for different chats in parallel while keeping each chat in order.
+
+    Every chat has its own FIFO and at most one running handler, so a reply
+    never overtakes an earlier one. At most ``max_concurrent`` chats run at
+    once. When ``max_pending`` updates are waiting, or any ``pressure()``
+    callable reports a saturated outbound pool, :meth:`submit` waits, which
+    stalls the update fetcher instead of piling up work in memory.
+    """
+
+    def __init__(self, max_concurrent=CHAT_MAX_CONCURRENT, max_pending=CHAT_MAX_PENDING, pressure=()):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.pressure = list(pressure)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "backpressure_waits": 0,
+                      "max_pending": 0, "max_active": 0}
+        self._queues = {}
+        self._workers = set()
+        self._pending = 0
+        self._active = 0
+        self._slots = None
+        self._drained = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _saturated(self) -> bool:
+        return self._pending >= self.max_pending or any(check() for check in self.pressure)
+
+    async def submit(self, chat_id, job, on_error=None) -> None:
+        """Queue ``job()`` (a coroutine function) behind the chat's earlier jobs.
+
+        If the job raises, ``await on_error(exception)`` runs in its place;
+        without one the exception is logged with its traceback.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._drained = asyncio.Event()
+            self._drained.set()
+        if self._saturated():
+            self.stats["backpressure_waits"] += 1
+            while self._saturated():
+                await asyncio.sleep(BACKPRESSURE_POLL)
+
+        self._pending += 1
+        self._drained.clear()
+        self.stats["submitted"] += 1
+        self.stats["max_pending"] = max(self.stats["max_pending"], self._pending)
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+            worker = asyncio.create_task(self._run_chat(chat_id, queue))
+            self._workers.add(worker)
+            worker.add_done_callback(self._workers.discard)
+        queue.append((job, on_error))
+
+    async def _run_chat(self, chat_id, queue: deque) -> None:
+        while queue:
+            job, on_error = queue[0]
+            async with self._slots:
+                self._active += 1
+                self.stats["max_active"] = max(self.stats["max_active"], self._active)
+                try:
+                    await job()
+                    self.stats["completed"] += 1
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    await self._report(chat_id, e, on_error)
+                finally:
+                    self._active -= 1
+                    queue.popleft()
+                    self._pending -= 1
+        del self._queues[chat_id]
+        if not self._pending:
+            self._drained.set()
+
+    async def _report(self, chat_id, error: Exception, on_error) -> None:
+        if on_error is not None:
+            try:
+                await on_error(error)
+                return
+            except Exception:
+                logger.exception(f"Penangan kesalahan gagal untuk chat {chat_id}")
+        logger.error(f"Kesalahan memproses pembaruan chat {chat_id}", exc_info=error)
+
+    def wrap(self, callback):
+        """Turn a ``callback(update, context)`` handler into one that goes through the scheduler.
+
+        Exceptions reach the Application's error handlers (``add_error_handler``)
+        just as they would from an unscheduled handler.
+        """
+        @functools.wraps(callback)
+        async def scheduled(update, context):
+            chat = update.effective_chat
+            await self.submit(chat.id if chat else None, functools.partial(callback, update, context),
+                              on_error=functools.partial(context.application.process_error, update))
+        return scheduled
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Let queued updates finish for up to ``timeout`` seconds, then cancel the rest."""
+        if self._drained is not None:
+            try:
+                await asyncio.wait_for(self._drained.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self._pending} pembaruan belum selesai saat berhenti")
+        for worker in list(self._workers):
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
@@ -0,0 +1,101 @@
+import unicodedata
+from collections import deque
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+class ContentFilter:
+    """Aho-Corasick matcher for the filtered word list.
+
+    The text is scanned once no matter how many words are loaded. ``add``
+    extends the trie in place; failure links are recomputed lazily on the next
+    scan. With ``word_boundary`` a word only matches when it is not part of a
+    longer alphanumeric token.
+    """
+
+    def __init__(self, words=(), word_boundary=False, normalize=True):
+        self.word_boundary = word_boundary
+        self.normalize = normalize
+        self.words = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [None]  # (panjang, nilai) kata yang berakhir di node ini
+        self._output = [()]
+        self._dirty = False
+        for word in words:
+            self.add(word)
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word: str, value=None) -> bool:
+        """Insert ``word`` (reported as ``value``, default the word itself).
+
+        Returns False if it was empty or already present.
+        """
+        pattern = normalize_text(word) if self.normalize else word
+        if not pattern:
+            return False
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+            node = next_node
+        if self._terminal[node] is not None:
+            return False
+        self._terminal[node] = (len(pattern), word if value is None else value)
+        self.words.append(word)
+        self._dirty = True
+        return True
+
+    def _build(self) -> None:
+        goto, fail = self._goto, self._fail
+        output = [(terminal,) if terminal else () for terminal in self._terminal]
+        queue = deque(goto[0].values())
+        for child in queue:
+            fail[child] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                output[child] = output[child] + output[fail[child]]
+        self._output = output
+        self._dirty = False
+
+    def iter_matches(self, text: str):
+        """Yield ``(start, end, value)`` for every word found in the (normalized) text."""
+        if self._dirty:
+            self._build()
+        if self.normalize:
+            text = normalize_text(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        word_boundary = self.word_boundary
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in output[node]:
+                start = index - length + 1
+                if word_boundary and (
+                    (start > 0 and text[start - 1].isalnum())
+                    or (index + 1 < len(text) and text[index + 1].isalnum())
+                ):
+                    continue
+                yield start, index + 1, value
+
+    def contains(self, text: str) -> bool:
+        for _ in self.iter_matches(text):
+            return True
+        return False
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "5"))
+
+try:
+    import h2  # noqa: F401  (httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+_host_slots = {}
+_in_flight = 0
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        logger.info(f"Klien HTTP bersama dibuat (http2={HTTP2_AVAILABLE})")
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+
+
+async def start(application=None) -> None:
+    """``post_init`` hook: open the pool before the first update arrives."""
+    get_client()
+
+
+async def stop(application=None) -> None:
+    """``post_shutdown`` hook."""
+    await close_client()
+
+
+def _slots(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    slots = _host_slots.get(host)
+    if slots is None:
+        slots = _host_slots[host] = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+    return slots
+
+
+async def get(url: str, params: dict = None, headers: dict = None, timeout: float = None) -> httpx.Response:
+    """GET through the shared pool, at most ``HTTP_MAX_PER_HOST`` in flight per host."""
+    global _in_flight
+    async with _slots(url):
+        _in_flight += 1
+        try:
+            return await get_client().get(url, params=params, headers=headers,
+                                          timeout=timeout if timeout is not None else HTTP_TIMEOUT)
+        finally:
+            _in_flight -= 1
+
+
+def saturated() -> bool:
+    """True while the pool is full or any host has all ``HTTP_MAX_PER_HOST`` slots taken.
+
+    With only a few upstream hosts the per-host cap is what fills first, so
+    ``HTTP_MAX_CONNECTIONS`` alone would never be reached.
+    """
+    return _in_flight >= HTTP_MAX_CONNECTIONS or any(slots.locked() for slots in _host_slots.values())
+
+
+async def fetch_json(url: str, params: dict = None, headers: dict = None, timeout: float = None) -> dict:
+    response = await get(url, params=params, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+async def _check_backpressure() -> None:
+    """Slow local upstream + ChatScheduler: the pressure signal must trip and hold submissions back."""
+    from chat_scheduler import ChatScheduler
+
+    async def handle(reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            await asyncio.sleep(0.2)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n{}")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+    scheduler = ChatScheduler(pressure=[saturated])
+
+    async def job():
+        await fetch_json(url)
+
+    for chat_id in range(5 * HTTP_MAX_PER_HOST):
+        await scheduler.submit(chat_id, job)
+        await asyncio.sleep(0.005)  # pembaruan datang bertahap, seperti dari getUpdates
+    await scheduler.stop()
+    server.close()
+    await close_client()
+    print(scheduler.stats)
+    assert scheduler.stats["backpressure_waits"] > 0, "sinyal tekanan HTTP tidak pernah aktif"
+    # Pengiriman ditahan di scheduler, bukan menumpuk di antrean semaphore per host.
+    assert scheduler.stats["max_active"] <= HTTP_MAX_PER_HOST, scheduler.stats
+
+
+if __name__ == "__main__":
+    # Pemeriksaan cepat: python http_client.py
+    asyncio.run(_check_backpressure())
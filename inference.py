@@ -0,0 +1,142 @@
+import logging
+import time
+from collections import OrderedDict
+import numpy as np
+from model_artifacts import ArtifactModel, as_artifact_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+DEFAULT_LATENCY_BUDGET_MS = 5.0
+DEFAULT_MEMO_SIZE = 4096
+MODEL_ORDER = ['naive_bayes', 'logistic_regression']
+
+_MISS = object()
+
+
+class LocalInference:
+    """Answers queries from the trained classifiers before any web lookup.
+
+    Models are tried cheapest first and the first prediction whose probability
+    reaches ``threshold`` wins. A model whose smoothed latency exceeds its budget
+    is skipped until that average decays back under it. Results are memoized per
+    version, so a repeated question costs a dict lookup.
+    """
+
+    def __init__(self, threshold=DEFAULT_CONFIDENCE_THRESHOLD, latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS,
+                 memo_size=DEFAULT_MEMO_SIZE):
+        self.threshold = threshold
+        self.latency_budget = latency_budget_ms / 1000
+        self.memo_size = memo_size
+        self.version = None
+        self.models = {}
+        self.vectorizers = {}
+        self.latency = {}
+        self.stats = {"hits": 0, "misses": 0, "memo_hits": 0, "over_budget": 0}
+        self._memo = OrderedDict()
+        self._compiled = {}
+
+    def set_models(self, version, models: dict, vectorizers: dict) -> None:
+        compiled = {model_name: _compile(model) for model_name, model in models.items()}
+        # The first call pays lazy sklearn setup; keep it out of the latency budget.
+        for model_name, vectorizer in vectorizers.items():
+            if model_name in compiled:
+                try:
+                    compiled[model_name](vectorizer.transform([""]))
+                except Exception as e:
+                    logger.error(f"Kesalahan pemanasan {model_name}: {e}")
+        # Everything is ready before the first attribute changes, so a predict() never sees half a swap.
+        self.models = models
+        self.vectorizers = vectorizers
+        self.version = version
+        self.latency = {}
+        self._memo = OrderedDict()
+        self._compiled = compiled
+
+    def predict(self, query: str):
+        """Return ``(answer, confidence, model_name)`` or ``None`` if no model is confident."""
+        memo = self._memo
+        result = memo.get(query, _MISS)
+        if result is not _MISS:
+            memo.move_to_end(query)
+            self.stats["memo_hits"] += 1
+            self.stats["hits" if result else "misses"] += 1
+            return result
+
+        result = self._predict(query)
+        memo[query] = result
+        if len(memo) > self.memo_size:
+            memo.popitem(last=False)
+        self.stats["hits" if result else "misses"] += 1
+        return result
+
+    def _predict(self, query: str):
+        features = {}
+        for model_name in MODEL_ORDER:
+            model = self.models.get(model_name)
+            vectorizer = self.vectorizers.get(model_name)
+            scorer = self._compiled.get(model_name)
+            if scorer is None or vectorizer is None:
+                continue
+            if self.latency.get(model_name, 0.0) > self.latency_budget:
+                # Decay so a model that was slow once gets probed again later.
+                self.latency[model_name] *= 0.9
+                continue
+
+            started = time.perf_counter()
+            try:
+                X = features.get(id(vectorizer))
+                if X is None:
+                    X = features[id(vectorizer)] = vectorizer.transform([query])
+                probabilities = scorer(X)
+            except Exception as e:
+                logger.error(f"Kesalahan inferensi {model_name}: {e}")
+                continue
+            finally:
+                elapsed = time.perf_counter() - started
+                previous = self.latency.get(model_name)
+                self.latency[model_name] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+                if elapsed > self.latency_budget:
+                    self.stats["over_budget"] += 1
+
+            best = probabilities.argmax()
+            confidence = float(probabilities[best])
+            if confidence >= self.threshold:
+                classes = model.classes if isinstance(model, ArtifactModel) else model.classes_
+                return str(classes[best]), confidence, model_name
+        return None
+
+
+def _softmax(scores):
+    scores = np.exp(scores - scores.max())
+    return scores / scores.sum()
+
+
+def _sigmoid(scores):
+    return 1 / (1 + np.exp(-scores))
+
+
+def _compile(model):
+    """Return ``X -> class probabilities`` computed straight from the weight arrays.
+
+    ``predict_proba`` spends milliseconds on input validation for a single row;
+    a sparse product over the same weights takes microseconds.
+    """
+    scorer = model if isinstance(model, ArtifactModel) else as_artifact_model(model)
+    if scorer is None:
+        return lambda X: model.predict_proba(X)[0]
+
+    scores = scorer.scores
+    if scorer.kind == "softmax":
+        return lambda X: _softmax(scores(X).ravel())
+    if scorer.kind == "binary":
+        def binary(X):
+            positive = _sigmoid(scores(X).ravel()[0])
+            return np.array([1 - positive, positive])
+        return binary
+
+    def one_vs_rest(X):
+        probabilities = _sigmoid(scores(X).ravel())
+        total = probabilities.sum()
+        return probabilities / total if total else np.full(len(probabilities), 1 / len(probabilities))
+    return one_vs_rest
@@ -0,0 +1,99 @@
+import inspect
+import json
+import logging
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+from content_filter import ContentFilter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Intent:
+    """One routing rule. Lower ``priority`` wins when several intents match."""
+    name: str
+    priority: int
+    keywords: list = field(default_factory=list)
+    pattern: Optional[str] = None
+    response: Optional[str] = None
+    handler: Optional[str] = None
+
+
+class IntentRouter:
+    """Routes a query to the highest-priority matching intent in one pass per matcher.
+
+    Keyword intents are compiled into a single Aho-Corasick automaton (substring
+    semantics, like the old ``"x" in query`` chain) and regex intents into one
+    alternation of named groups. Priority defaults to the order in the file.
+    """
+
+    def __init__(self, intents, handlers=None):
+        self.intents = sorted(intents, key=lambda intent: intent.priority)
+        self.handlers = handlers or {}
+        self.stats = Counter()
+        self._keywords = ContentFilter(normalize=False)
+        self._by_group = {}
+        groups = []
+        for intent in self.intents:
+            for keyword in intent.keywords:
+                self._keywords.add(keyword, intent)
+            if intent.pattern:
+                group = f"i{len(groups)}"
+                self._by_group[group] = intent
+                groups.append(f"(?P<{group}>{intent.pattern})")
+            if intent.handler and intent.handler not in self.handlers:
+                logger.warning(f"Intent {intent.name}: handler '{intent.handler}' tidak terdaftar")
+        self._pattern = re.compile("|".join(groups)) if groups else None
+
+    @classmethod
+    def from_file(cls, path: str, handlers=None) -> "IntentRouter":
+        intents = []
+        if os.path.exists(path):
+            with open(path, "r", encoding='utf-8') as f:
+                for position, entry in enumerate(json.load(f)):
+                    entry.setdefault("priority", position)
+                    intents.append(Intent(**entry))
+        return cls(intents, handlers)
+
+    def route(self, query: str) -> Optional[Intent]:
+        best = None
+        if self._pattern is not None:
+            for match in self._pattern.finditer(query):
+                intent = self._by_group[match.lastgroup]
+                if best is None or intent.priority < best.priority:
+                    best = intent
+        for _, _, intent in self._keywords.iter_matches(query):
+            if best is None or intent.priority < best.priority:
+                best = intent
+                if best is self.intents[0]:
+                    break
+        self.stats[best.name if best else "fallback"] += 1
+        return best
+
+    async def dispatch(self, intent: Intent, query: str) -> str:
+        if intent.handler is None:
+            return intent.response
+        result = self.handlers[intent.handler](query)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: python intent_router.py
+    import random
+    import time
+
+    router = IntentRouter.from_file("intents.json", handlers={"calculate": None, "about_bot": None, "about_creator": None})
+    messages = ["apa kabar hari ini", "12 * (3 + 4)", "siapa presiden pertama indonesia",
+                "saya suka musik jazz", "bagaimana cuaca di bandung besok", "ceritakan sejarah majapahit " * 4]
+    samples = [random.choice(messages) for _ in range(20000)]
+    started = time.perf_counter()
+    for message in samples:
+        router.route(message)
+    elapsed = time.perf_counter() - started
+    print(f"{elapsed / len(samples) * 1e6:.2f} us/pesan, {len(router.intents)} intent")
+    print(dict(router.stats))
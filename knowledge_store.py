@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from answer_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DB_FILE = os.getenv("KNOWLEDGE_DB_FILE", "knowledge.db")
+
+# Jenis data -> berkas JSON lama yang dimigrasikan sekali ke SQLite.
+LEGACY_FILES = {
+    "qa": "qa_model.json",
+    "advice": "advice_model.json",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS knowledge (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    query TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    user_id INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS knowledge_lookup ON knowledge (kind, normalized);
+CREATE INDEX IF NOT EXISTS knowledge_user ON knowledge (user_id) WHERE user_id IS NOT NULL;
+"""
+
+_SELECT_ANSWERS = "SELECT answer FROM knowledge WHERE kind = ? AND normalized = ? ORDER BY id"
+_SELECT_KEYS = "SELECT query FROM knowledge WHERE kind = ? GROUP BY normalized ORDER BY MIN(id)"
+_SELECT_ITEMS = "SELECT query, answer FROM knowledge WHERE kind = ? ORDER BY id"
+_SELECT_USER = "SELECT kind, query, answer FROM knowledge WHERE user_id = ? ORDER BY id"
+_SELECT_KEYS_AFTER = "SELECT id, query FROM knowledge WHERE kind = ? AND id > ? ORDER BY id"
+_LAST_ID = "SELECT COALESCE(MAX(id), 0) FROM knowledge WHERE kind = ?"
+_COUNT = "SELECT COUNT(*) FROM knowledge WHERE kind = ?"
+_DELETE = "DELETE FROM knowledge WHERE kind = ? AND normalized = ?"
+_INSERT = ("INSERT INTO knowledge (kind, query, normalized, answer, user_id, created_at) "
+           "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+class KnowledgeStore:
+    """SQLite repository for the qa and advice knowledge used by llm.py.
+
+    Every lookup goes through the ``(kind, normalized)`` index. The database
+    runs in WAL mode so readers in other threads or processes never block on
+    a writer; each thread gets its own connection, and statements are fixed
+    strings so sqlite3's statement cache reuses the prepared plans.
+    """
+
+    def __init__(self, path=KNOWLEDGE_DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, cached_statements=64)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with db:
+                db.executescript(_SCHEMA)  # saat koneksi dibuka, bukan saat modul bot diimpor
+            self._local.db = db
+        return db
+
+    def close(self) -> None:
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def answers(self, kind: str, query: str) -> list:
+        rows = self._connection().execute(_SELECT_ANSWERS, (kind, normalize_query(query))).fetchall()
+        return [answer for (answer,) in rows]
+
+    def keys(self, kind: str):
+        for (query,) in self._connection().execute(_SELECT_KEYS, (kind,)):
+            yield query
+
+    def items(self, kind: str):
+        yield from self._connection().execute(_SELECT_ITEMS, (kind,))
+
+    def user_entries(self, user_id: int) -> list:
+        return self._connection().execute(_SELECT_USER, (user_id,)).fetchall()
+
+    def keys_after(self, kind: str, after_id: int) -> list:
+        """``(id, query)`` rows added after ``after_id``, e.g. by another process."""
+        return self._connection().execute(_SELECT_KEYS_AFTER, (kind, after_id)).fetchall()
+
+    def last_id(self, kind: str) -> int:
+        return self._connection().execute(_LAST_ID, (kind,)).fetchone()[0]
+
+    def count(self, kind: str) -> int:
+        return self._connection().execute(_COUNT, (kind,)).fetchone()[0]
+
+    def add(self, kind: str, query: str, answer: str, user_id: int = None, replace: bool = False) -> None:
+        """Store an answer; with ``replace`` the query's previous answers are dropped first."""
+        normalized = normalize_query(query)
+        with self._write_lock:
+            db = self._connection()
+            with db:
+                if replace:
+                    db.execute(_DELETE, (kind, normalized))
+                db.execute(_INSERT, (kind, query, normalized, answer, user_id, time.time()))
+
+    def migrate_json(self, kind: str, path: str) -> int:
+        """One-shot import of a legacy ``{query: answer | [answers]}`` JSON file.
+
+        Skipped when the file is missing or ``kind`` already has rows. The check
+        and the insert share one write transaction, so concurrent shard
+        processes import the file only once.
+        """
+        if not os.path.exists(path) or self.count(kind) > 0:
+            return 0
+        with open(path, "r", encoding='utf-8') as f:
+            data = f.read().strip()
+        model = json.loads(data) if data else {}
+        now = time.time()
+        rows = []
+        for query, answers in model.items():
+            for answer in answers if isinstance(answers, list) else [answers]:
+                rows.append((kind, query, normalize_query(query), answer, None, now))
+        with self._write_lock:
+            db = self._connection()
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                if db.execute(_COUNT, (kind,)).fetchone()[0] > 0:
+                    return 0
+                db.executemany(_INSERT, rows)
+        logger.info(f"{len(rows)} entri {kind} dimigrasikan dari {path}")
+        return len(rows)
+
+    def migrate_legacy_files(self, directory=".") -> dict:
+        return {kind: self.migrate_json(kind, os.path.join(directory, filename))
+                for kind, filename in LEGACY_FILES.items()}
+
+
+if __name__ == "__main__":
+    # Migrasi sekali jalan: python knowledge_store.py [direktori-json]
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    store = KnowledgeStore()
+    print(store.migrate_legacy_files(sys.argv[1] if len(sys.argv) > 1 else "."))
@@ -1,20 +1,41 @@
+import asyncio
 import logging
 import os
-import json
 import random
-import requests
-from gtts import gTTS
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
 from dotenv import load_dotenv
-from fuzzywuzzy import process
-from nltk.stem import PorterStemmer
 import re
-from bs4 import BeautifulSoup
-import sympy as sp  # Impor pustaka sympy
+import startup
+import http_client
+from qa_index import QAIndex
+from content_filter import ContentFilter
+from knowledge_store import KnowledgeStore
+from voice_cache import VoiceCache
+from tts_pipeline import TTSPipeline
+from arithmetic import evaluate
+from symbolic_math import SymbolicMath, SymbolicMathTimeout
+from chat_scheduler import ChatScheduler
+from reply_composer import ReplyComposer
+from answer_cache import normalize_query
+from single_flight import SingleFlight
+from provider_health import CircuitOpen, ProviderHealth
+from search_budget import EXHAUSTED, NORMAL, SearchBudget, from_reserve
+from rate_limiter import PRIORITY_COMMAND, RATE_LIMIT_GLOBAL, TelegramRateLimiter, with_priority
+import webhook
+from webhook import WebhookApp
+import sharding
+from persistence import SQLitePersistence
+
+# nltk (menarik scipy.stats) dan bs4 baru diimpor saat pertama dipakai.
+nltk_stem = startup.lazy_import("nltk.stem")
+bs4 = startup.lazy_import("bs4")
+startup.checkpoint("impor modul")
 
 # Load environment variables
 load_dotenv()
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # polling | webhook
 
 WELCOME_TEXT = "Selamat datang! Kirim pesan untuk memulai pertanyaan."
 HELP_TEXT = "/start - Memulai percakapan\n/help - Menampilkan daftar perintah"
@@ -24,79 +45,84 @@ ABOUT_TEXT = "Saya adalah bot yang belajar dari percakapan Anda untuk memberikan
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load models
-def load_qa_model():
-    if os.path.exists("qa_model.json"):
-        with open("qa_model.json", "r") as f:
-            return json.load(f)
-    return {}
-
-def load_pantun_model():
-    if os.path.exists("pantun_model.json"):
-        with open("pantun_model.json", "r") as f:
-            return json.load(f)
-    return {}
-
-def load_advice_model():
-    if os.path.exists("advice_model.json"):
-        with open("advice_model.json", "r") as f:
-            return json.load(f)
-    return {}
-
-qa_model = load_qa_model()
-pantun_model = load_pantun_model()
-advice_model = load_advice_model()
-
-user_query_count = {}
+# Model dimuat di on_startup, paralel, setelah bot tersambung.
+knowledge_store = KnowledgeStore()
+qa_index_last_id = 0
+qa_index = QAIndex()
+advice_matcher = ContentFilter(normalize=False)
+
+KNOWLEDGE_REFRESH_INTERVAL = 30  # detik
 FILTER_WORDS = ["kontol", "memek"]
-ps = PorterStemmer()  # Initialize the stemmer
+content_filter = ContentFilter(FILTER_WORDS)
+ps = None  # PorterStemmer, dibuat saat stem_query pertama kali dipanggil
+background_tasks = []  # prerender suara dan penyegaran indeks QA; dibatalkan di on_shutdown
+voice_cache = VoiceCache()
+tts_pipeline = TTSPipeline(voice_cache)
+reply_composer = ReplyComposer(tts_pipeline)
+symbolic_math = SymbolicMath()
+# Batas global Telegram berlaku per bot, jadi dibagi rata antar shard; chat selalu di satu shard.
+rate_limiter = TelegramRateLimiter(global_rate=RATE_LIMIT_GLOBAL / sharding.SHARD_COUNT)
+web_lookups = SingleFlight()  # pencarian identik yang bersamaan digabung menjadi satu
+chat_scheduler = ChatScheduler(pressure=[http_client.saturated, tts_pipeline.saturated, rate_limiter.saturated])
+startup.checkpoint("inisialisasi global")
 
 # Check for filtered words
 def contains_filtered_words(text: str) -> bool:
-    return any(word in text for word in FILTER_WORDS)
+    return content_filter.contains(text)
 
 # Stem user query for better matching
 def stem_query(query: str) -> str:
+    global ps
+    if ps is None:
+        ps = nltk_stem.PorterStemmer()
     return ' '.join([ps.stem(word) for word in query.split()])
 
 # Extract keywords from user query
 def extract_keywords(query: str) -> list:
     return query.split()  # Simple space-based extraction
 
-# Save updated QA model
-def save_qa_model(model):
-    with open("qa_model.json", "w") as f:
-        json.dump(model, f, ensure_ascii=False, indent=4)
-
 # Function to evaluate mathematical expressions, including calculus
-def calculate(expression: str) -> str:
+async def calculate(expression: str) -> str:
     try:
         # Detect if the user wants to perform calculus operations
+        # SymPy berjalan di proses pekerja terpisah dengan batas waktu, bukan di event loop.
         if "turun" in expression or "turunan" in expression:
             # Ambil fungsi dan variabel
             func_str = re.search(r'fungsi (.+)', expression).group(1).strip()
-            x = sp.symbols('x')
-            func = sp.sympify(func_str)
-            derivative = sp.diff(func, x)
+            func, derivative = await symbolic_math.derivative(func_str)
             return f"Turunan dari {func} adalah {derivative}"
         
         elif "integral" in expression:
             # Ambil fungsi
             func_str = re.search(r'integral (.+)', expression).group(1).strip()
-            x = sp.symbols('x')
-            func = sp.sympify(func_str)
-            integral = sp.integrate(func, x)
+            func, integral = await symbolic_math.integral(func_str)
             return f"Integral dari {func} adalah {integral}"
 
-        # Remove any unwanted characters and spaces for basic calculations
-        expression = re.sub(r'[^\d+\-*/().]', '', expression)
-        result = eval(expression)
-        return str(result)
+        return str(evaluate(expression))
     
+    except SymbolicMathTimeout as e:
+        logger.warning(f"Perhitungan simbolik dihentikan: {e}")
+        return "Maaf, perhitungan itu terlalu lama untuk diselesaikan."
     except Exception as e:
         logger.error(f"Error calculating expression: {e}")
         return "Maaf, saya tidak dapat menghitung itu."
 
+# Breaker per penyedia: penyedia yang mati atau tanpa API key gagal seketika.
+bing_health = ProviderHealth("bing")
+wikipedia_health = ProviderHealth("wikipedia")
+if not os.getenv("BING_API_KEY"):
+    bing_health.disable("BING_API_KEY tidak diisi")
+bing_budget = SearchBudget()  # kuota Bing yang sama dengan app.py
+
+async def call_provider(health: ProviderHealth, endpoint: str, **kwargs):
+    try:
+        return await health.call(http_client.fetch_json, endpoint, **kwargs)
+    except CircuitOpen:
+        return None
+    except Exception as e:
+        logger.warning(f"Kesalahan pencarian {health.name}: {type(e).__name__} {e}")
+        return None
+
 # Fungsi untuk mencari di Bing
 async def search_bing(query: str) -> str:
     api_key = os.getenv("BING_API_KEY")
@@ -105,13 +131,18 @@ async def search_bing(query: str) -> str:
     headers = {"Ocp-Apim-Subscription-Key": api_key}
     params = {"q": query, "textDecorations": True, "textFormat": "HTML"}
 
-    response = requests.get(endpoint, headers=headers, params=params)
-    if response.status_code == 200:
-        search_results = response.json()
+    # Kuota diklaim di executor; breaker dicek ulang sesudahnya karena klaim memakai await.
+    if bing_health.available:
+        if not await bing_budget.claim_async():
+            return None
+        if not bing_health.available:
+            await bing_budget.refund_async()  # permintaan tidak akan dikirim
+    search_results = await call_provider(bing_health, endpoint, headers=headers, params=params)
+    if search_results:
         if "webPages" in search_results and "value" in search_results["webPages"]:
             top_result = search_results["webPages"]["value"][0]
             raw_snippet = top_result["snippet"]
-            cleaned_snippet = BeautifulSoup(raw_snippet, "html.parser").get_text()
+            cleaned_snippet = bs4.BeautifulSoup(raw_snippet, "html.parser").get_text()
             return cleaned_snippet  # Mengembalikan cuplikan yang sudah dibersihkan
     return None
 
@@ -127,16 +158,33 @@ async def search_wikipedia(query: str) -> str:
         "srlimit": 1  # Ambil hanya satu hasil
     }
 
-    response = requests.get(endpoint, params=params)
-    if response.status_code == 200:
-        search_results = response.json()
+    search_results = await call_provider(wikipedia_health, endpoint, params=params)
+    if search_results:
         if "query" in search_results and "search" in search_results["query"]:
             if search_results["query"]["search"]:
                 page_title = search_results["query"]["search"][0]["title"]
                 page_snippet = search_results["query"]["search"][0]["snippet"]
-                return f"{page_title}: {BeautifulSoup(page_snippet, 'html.parser').get_text()}"  # Mengembalikan judul dan cuplikan
+                return f"{page_title}: {bs4.BeautifulSoup(page_snippet, 'html.parser').get_text()}"  # Mengembalikan judul dan cuplikan
     return None
 
+async def search_web(query: str) -> str:
+    # Bing dulu; jika tidak ada hasil, Wikipedia. Saat anggaran menipis urutannya dibalik.
+    plan = await bing_budget.plan_async()
+    if plan == NORMAL:
+        return await search_bing(query) or await search_wikipedia(query)
+    response = await search_wikipedia(query)
+    if response:
+        bing_budget.avoided("wikipedia")
+        return response
+    if plan == EXHAUSTED or not bing_health.available:
+        bing_budget.avoided("exhausted")
+        return None
+    token = from_reserve.set(True)
+    try:
+        return await search_bing(query)
+    finally:
+        from_reserve.reset(token)
+
 # Command handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     keyboard = [
@@ -167,59 +215,54 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_query = update.message.text.lower().strip()
-    user_id = update.message.from_user.id
     response = None
 
-    user_query_count.setdefault(user_id, {})
-    user_query_count[user_id][user_query] = user_query_count[user_id].get(user_query, 0) + 1
+    query_count = context.user_data.setdefault('query_count', {})
+    query_count[user_query] = query_count.get(user_query, 0) + 1
 
     # Pertama, cari di model QA
-    result = process.extractOne(user_query, qa_model.keys(), score_cutoff=70)
+    result = qa_index.match(user_query)
     if result:
         best_match, score = result
-        response = random.choice(qa_model[best_match])
+        response = random.choice(knowledge_store.answers("qa", best_match))
     else:
-        # Jika tidak ada hasil, cari di Bing
-        bing_response = await search_bing(user_query)
-        if bing_response:
-            response = bing_response
+        # Jika tidak ada hasil, cari di Bing lalu Wikipedia
+        web_response = await web_lookups.do(normalize_query(user_query), search_web, user_query)
+        if web_response:
+            response = web_response
         else:
-            # Jika tidak ada hasil dari Bing, cari di Wikipedia
-            wiki_response = await search_wikipedia(user_query)
-            if wiki_response:
-                response = wiki_response
-            else:
-                response = "Sepertinya saya tidak tahu jawaban untuk itu. Namun, saya akan berusaha belajar dari Anda."
-                context.user_data['learning_query'] = user_query  # Simpan kueri untuk pembelajaran
+            response = "Sepertinya saya tidak tahu jawaban untuk itu. Namun, saya akan berusaha belajar dari Anda."
+            context.user_data['learning_query'] = user_query  # Simpan kueri untuk pembelajaran
 
     # Periksa apakah ini adalah ekspresi matematis
     if re.match(r'^[\d\s\+\-\*/().]+$|turun|integral', user_query):
-        response = calculate(user_query)
+        response = await calculate(user_query)
 
     if contains_filtered_words(response):
         response = "Maaf, saya tidak dapat memberikan informasi tentang itu."
 
-    await update.message.reply_text(response)
-    await send_voice_response(update, response)
-
-    if response.startswith("Sepertinya saya tidak tahu jawaban untuk itu."):
-        await update.message.reply_text("Silakan kirim jawaban Anda untuk mengajarkan saya.")
+    async with reply_composer.compose(update.message) as reply:
+        reply.text(response)
+        reply.voice(response)
+        if response.startswith("Sepertinya saya tidak tahu jawaban untuk itu."):
+            reply.text("Silakan kirim jawaban Anda untuk mengajarkan saya.")
 
 async def handle_learning(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if 'learning_query' in context.user_data:
         user_query = context.user_data['learning_query']
         user_answer = update.message.text
 
-        qa_model[user_query] = [user_answer]
-        save_qa_model(qa_model)
+        knowledge_store.add("qa", user_query, user_answer, user_id=update.message.from_user.id, replace=True)
+        qa_index.add(user_query)
 
         await update.message.reply_text(f"Saya telah belajar tentang: {user_query}. Terima kasih!")
         del context.user_data['learning_query']
 
 async def provide_advice(user_query: str) -> str:
-    for keyword, advice in advice_model.items():
-        if keyword in user_query:
-            return advice
+    matches = [value for _, _, value in advice_matcher.iter_matches(user_query)]
+    if matches:
+        _, keyword = min(matches)
+        return knowledge_store.answers("advice", keyword)[0]
     return "Saya tidak memiliki saran untuk itu. Namun, saya akan berusaha belajar lebih banyak."
 
 async def handle_advice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -228,30 +271,101 @@ async def handle_advice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     await update.message.reply_text(advice)
 
 async def send_voice_response(update: Update, text: str) -> None:
-    voice_file = "voice_response.ogg"
-    try:
-        tts = gTTS(text=text, lang='id')
-        tts.save(voice_file)
-        with open(voice_file, 'rb') as voice:
-            await update.message.reply_voice(voice=voice)
-    except Exception as e:
-        logger.error(f"Error sending voice message: {e}")
-    finally:
-        if os.path.exists(voice_file):
-            os.remove(voice_file)
+    # Suara dikirim di latar belakang; balasan teks tidak menunggu TTS.
+    tts_pipeline.submit(update.message, text)
+
+async def refresh_qa_index():
+    # Shard lain bisa mengajarkan QA baru lewat basis pengetahuan bersama.
+    global qa_index_last_id
+    while True:
+        await asyncio.sleep(KNOWLEDGE_REFRESH_INTERVAL)
+        for row_id, query in knowledge_store.keys_after("qa", qa_index_last_id):
+            qa_index.add(query)
+            qa_index_last_id = row_id
+
+def load_qa_index():
+    last_id = knowledge_store.last_id("qa")
+    return last_id, QAIndex(knowledge_store.keys("qa"))
+
+def load_advice_matcher():
+    matcher = ContentFilter(normalize=False)
+    for position, keyword in enumerate(knowledge_store.keys("advice")):
+        matcher.add(keyword, (position, keyword))
+    return matcher
+
+async def load_models():
+    global qa_index_last_id, qa_index, advice_matcher
+    loop = asyncio.get_running_loop()
+    with startup.phase("migrasi basis pengetahuan"):
+        await loop.run_in_executor(None, knowledge_store.migrate_legacy_files)
+    loaded = await startup.load_parallel({"indeks QA": load_qa_index, "saran": load_advice_matcher})
+    qa_index_last_id, qa_index = loaded["indeks QA"]
+    advice_matcher = loaded["saran"]
+
+async def on_startup(application) -> None:
+    with startup.phase("klien http"):
+        await http_client.start(application)
+    with startup.phase("cache suara"):
+        await asyncio.get_running_loop().run_in_executor(None, voice_cache.open)
+    tts_pipeline.start()
+    symbolic_math.start()
+    await load_models()
+    background_tasks.append(asyncio.create_task(
+        voice_cache.prerender([WELCOME_TEXT, HELP_TEXT, ABOUT_TEXT], tts_pipeline.executor)))
+    if sharding.SHARD_COUNT > 1:
+        background_tasks.append(asyncio.create_task(refresh_qa_index()))
+    startup.preload(bs4)
+    startup.mark_ready()
+
+async def on_shutdown(application) -> None:
+    startup.clear_ready()
+    await chat_scheduler.stop()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    logger.info(f"Statistik penyusun balasan: {reply_composer.stats}")
+    logger.info(f"Statistik penggabungan pencarian: {web_lookups.stats}")
+    logger.info(f"Statistik penyedia: bing {bing_health.stats}, wikipedia {wikipedia_health.stats}")
+    logger.info(f"Anggaran Bing: {await asyncio.get_running_loop().run_in_executor(None, bing_budget.report)}")
+    bing_budget.close()
+    await symbolic_math.stop()
+    await tts_pipeline.stop()
+    voice_cache.close()
+    await http_client.stop(application)
+
+def build_application(request=None):
+    builder = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .persistence(SQLitePersistence())
+        .rate_limiter(rate_limiter)
+    )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
+    application.add_handler(CommandHandler("start", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, start))))
+    application.add_handler(CommandHandler("help", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, help_command))))
+    application.add_handler(CommandHandler("about", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, about_command))))
+    application.add_handler(CommandHandler("feedback", chat_scheduler.wrap(with_priority(PRIORITY_COMMAND, feedback))))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, chat_scheduler.wrap(echo)))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, chat_scheduler.wrap(handle_learning)))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, chat_scheduler.wrap(handle_advice)))
+
+    return application
+
+webhook_app = WebhookApp(build_application)
 
 def main() -> None:
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    application = ApplicationBuilder().token(bot_token).build()
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("about", about_command))
-    application.add_handler(CommandHandler("feedback", feedback))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_learning))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_advice))
-
-    application.run_polling()
+    shards = sharding.shard_count(BOT_MODE)
+    if shards > 1:
+        sharding.run(build_application, TELEGRAM_BOT_TOKEN, shards=shards, mode=BOT_MODE)
+    elif BOT_MODE == "webhook":
+        webhook.serve(webhook_app, TELEGRAM_BOT_TOKEN)
+    else:
+        build_application().run_polling()
 
 if __name__ == '__main__':
     main()
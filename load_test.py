@@ -0,0 +1,214 @@
+"""Replay synthetic updates through python-telegram-bot against a fake Bot API.
+
+    python load_test.py --chats 50 --messages 10 --latency 0.2
+    python load_test.py --chats 50 --messages 3 --flood-limits
+
+Runs the same workload once with updates handled one at a time (the old
+behaviour) and once through ChatScheduler, then prints throughput, reply
+latency and whether any chat saw its replies out of order. With
+``--flood-limits`` the fake API enforces Telegram's global and per-chat
+send limits, and the scheduled run also goes through TelegramRateLimiter.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from telegram.error import RetryAfter
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.request import BaseRequest
+from chat_scheduler import ChatScheduler
+from rate_limiter import RATE_LIMIT_GLOBAL, RATE_LIMIT_PER_CHAT, TelegramRateLimiter, TokenBucket
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "LoadTest", "username": "load_test_bot"}
+FLOOD_TOLERANCE = 0.1  # token; jeda jaringan membuat pengiriman tepat waktu datang sedikit lebih awal
+
+
+class FakeBotAPI(BaseRequest):
+    """Answers Bot API calls in memory: serves queued updates and records sent messages."""
+
+    def __init__(self, updates, api_latency=0.01, flood_limits=False):
+        self.api_latency = api_latency
+        self.flood_limits = flood_limits
+        self.flood_errors = 0
+        self._global_bucket = None
+        self._chat_buckets = {}
+        self.updates = list(updates)
+        self.served_at = {}
+        self.replies = defaultdict(list)
+        self.latencies = []
+        self.done = asyncio.Event()
+        self._expected = len(self.updates)
+        self._message_id = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        if endpoint == "getUpdates":
+            result = await self._get_updates(params)
+        elif endpoint == "getMe":
+            result = BOT_USER
+        elif endpoint == "sendMessage":
+            await asyncio.sleep(self.api_latency)
+            retry_after = self._flood_check(params)
+            if retry_after:
+                self.flood_errors += 1
+                return 429, json.dumps({"ok": False, "error_code": 429,
+                                        "description": f"Too Many Requests: retry after {retry_after}",
+                                        "parameters": {"retry_after": retry_after}}).encode()
+            result = self._record_reply(params)
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    def _flood_check(self, params) -> int:
+        """Seconds to wait if this send breaks the global or per-chat limit, else 0."""
+        if not self.flood_limits:
+            return 0
+        now = time.monotonic()
+        if self._global_bucket is None:
+            self._global_bucket = TokenBucket(RATE_LIMIT_GLOBAL, RATE_LIMIT_GLOBAL + FLOOD_TOLERANCE, now)
+        chat = self._chat_buckets.get(params["chat_id"])
+        if chat is None:
+            chat = self._chat_buckets[params["chat_id"]] = TokenBucket(RATE_LIMIT_PER_CHAT,
+                                                                       1 + FLOOD_TOLERANCE, now)
+        if chat.delay(now) > 0 or self._global_bucket.delay(now) > 0:
+            return 1
+        chat.take(now)
+        self._global_bucket.take(now)
+        return 0
+
+    async def _get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        self.updates = [update for update in self.updates if update["update_id"] >= offset]
+        batch = self.updates[:int(params.get("limit") or 100)]
+        if not batch:
+            await asyncio.sleep(0.05)
+        now = time.perf_counter()
+        for update in batch:
+            self.served_at.setdefault(update["update_id"], now)
+        return batch
+
+    def _record_reply(self, params):
+        chat_id = int(params["chat_id"])
+        update_id, _, sequence = params["text"].partition(":")
+        if sequence.isdigit():
+            # Balasan gema dari handler sintetis: "update_id:urutan".
+            self.replies[chat_id].append(int(sequence))
+            self.latencies.append(time.perf_counter() - self.served_at[int(update_id)])
+        else:
+            self.replies[chat_id].append(params["text"])
+        if sum(map(len, self.replies.values())) >= self._expected:
+            self.done.set()
+        self._message_id += 1
+        return {"message_id": self._message_id, "date": int(time.time()), "text": params["text"],
+                "chat": {"id": chat_id, "type": "private"}, "from": BOT_USER}
+
+
+def synthetic_updates(chats: int, messages: int, seed: int = 0) -> list:
+    """``chats * messages`` text updates, interleaved across chats but ordered within each chat."""
+    rng = random.Random(seed)
+    remaining = {chat_id: 0 for chat_id in range(1000, 1000 + chats)}
+    updates = []
+    while remaining:
+        chat_id = rng.choice(list(remaining))
+        sequence = remaining[chat_id]
+        update_id = len(updates) + 1
+        updates.append({"update_id": update_id, "message": {
+            "message_id": update_id, "date": int(time.time()), "text": f"{update_id}:{sequence}",
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+        }})
+        remaining[chat_id] += 1
+        if remaining[chat_id] == messages:
+            del remaining[chat_id]
+    return updates
+
+
+async def run(updates, latency, scheduler=None, api_latency=0.01, flood_limits=False, rate_limiter=None,
+              timeout=120):
+    api = FakeBotAPI(updates, api_latency, flood_limits)
+    builder = ApplicationBuilder().token("0:load-test").request(api).get_updates_request(api)
+    if rate_limiter is not None:
+        builder = builder.rate_limiter(rate_limiter)
+    application = builder.build()
+    rng = random.Random(1)
+    lost = 0
+
+    async def handle(update, context):
+        nonlocal lost
+        # Jeda acak meniru pencarian web / TTS yang lambat.
+        await asyncio.sleep(rng.expovariate(1 / latency))
+        try:
+            await update.message.reply_text(update.message.text)
+        except RetryAfter:
+            # Tanpa pembatas laju, balasan yang kena flood limit hilang.
+            lost += 1
+        if sum(map(len, api.replies.values())) + lost >= len(updates):
+            api.done.set()
+
+    application.add_handler(MessageHandler(filters.TEXT, scheduler.wrap(handle) if scheduler else handle))
+    started = time.perf_counter()
+    async with application:
+        await application.start()
+        await application.updater.start_polling(poll_interval=0)
+        try:
+            await asyncio.wait_for(api.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+        await application.updater.stop()
+        if scheduler:
+            await scheduler.stop()
+        await application.stop()
+
+    latencies = sorted(api.latencies) or [0.0]
+    out_of_order = sum(replies != sorted(replies) for replies in api.replies.values())
+    return {
+        "updates": len(api.latencies),
+        "seconds": round(elapsed, 2),
+        "per_second": round(len(api.latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+        "chats_out_of_order": out_of_order,
+        "flood_errors": api.flood_errors,
+        "lost": lost,
+    }
+
+
+async def main(args):
+    updates = synthetic_updates(args.chats, args.messages)
+    if not args.skip_sequential:
+        print("berurutan  ", await run(updates, args.latency))
+        if args.flood_limits:
+            print("  +flood   ", await run(updates, args.latency, flood_limits=True))
+    scheduler = ChatScheduler(max_concurrent=args.concurrency, max_pending=args.max_pending)
+    print("per-chat   ", await run(updates, args.latency, scheduler), scheduler.stats)
+    if args.flood_limits:
+        scheduler = ChatScheduler(max_concurrent=args.concurrency, max_pending=args.max_pending)
+        print("  +flood   ", await run(updates, args.latency, scheduler, flood_limits=True))
+        limiter = TelegramRateLimiter()
+        scheduler = ChatScheduler(max_concurrent=args.concurrency, max_pending=args.max_pending,
+                                  pressure=[limiter.saturated])
+        print("  +pembatas", await run(updates, args.latency, scheduler, flood_limits=True, rate_limiter=limiter),
+              limiter.stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="rata-rata waktu handler (detik)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-pending", type=int, default=1000)
+    parser.add_argument("--skip-sequential", action="store_true")
+    parser.add_argument("--flood-limits", action="store_true", help="API palsu menegakkan batas laju Telegram")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import startup
+
+# scipy dan sklearn baru diimpor saat artefak pertama dimuat atau diterbitkan.
+sparse = startup.lazy_import("scipy.sparse")
+sklearn_text = startup.lazy_import("sklearn.feature_extraction.text")
+naive_bayes = startup.lazy_import("sklearn.naive_bayes")
+linear_model = startup.lazy_import("sklearn.linear_model")
+
+logger = logging.getLogger(__name__)
+
+MODEL_ROOT = os.getenv("MODEL_ROOT", "models")
+CURRENT_LINK = "current"
+MANIFEST_FILE = "manifest.json"
+KEEP_VERSIONS = 3
+FORMAT_VERSION = 2
+SUPPORTED_FORMATS = (1, 2)  # format 1: bobot padat (n_features, n_classes)
+
+
+class ArtifactError(Exception):
+    pass
+
+
+@dataclass
+class ArtifactModel:
+    """Read-only linear scorer: ``scores = X @ weights + rowsum(X) * row_bias + bias``.
+
+    ``weights`` is a sparse (n_features, n_classes) float32 CSR matrix holding
+    only features seen in training, so an artifact grows with the vocabulary
+    actually learned rather than ``n_features * n_classes``. Naive Bayes gives
+    every unseen feature the same per-class log probability; that constant
+    is ``row_bias`` and the stored weights are the offsets from it. ``kind``
+    says how scores become probabilities: ``softmax`` (naive Bayes,
+    multinomial logistic regression), ``ovr`` (one-vs-rest logistic) or
+    ``binary`` (single logistic column).
+    """
+    kind: str
+    weights: "sparse.csr_matrix"
+    bias: np.ndarray
+    classes: np.ndarray
+    row_bias: Optional[np.ndarray] = None
+
+    def scores(self, X) -> np.ndarray:
+        """Raw ``(n_samples, n_classes)`` scores for a sparse feature matrix."""
+        product = X @ self.weights
+        scores = product.toarray() if sparse.issparse(product) else np.asarray(product)
+        if self.row_bias is not None:
+            scores = scores + np.outer(np.asarray(X.sum(axis=1)).ravel(), self.row_bias)
+        return scores + self.bias
+
+
+@dataclass
+class ModelArtifact:
+    version: int
+    path: str
+    vectorizer: "sklearn_text.HashingVectorizer"
+    models: dict
+    manifest: dict
+
+
+def _sparse_weights(dense) -> "sparse.csr_matrix":
+    return sparse.csr_matrix(np.asarray(dense, dtype=np.float32).T)
+
+
+def as_artifact_model(model) -> Optional[ArtifactModel]:
+    """Convert a fitted sklearn estimator to an ArtifactModel, or None if unsupported."""
+    if hasattr(model, "feature_log_prob_"):
+        log_prob = model.feature_log_prob_
+        seen = model.feature_count_ > 0
+        # Log-probabilitas fitur yang belum pernah muncul sama untuk satu kelas: ambil dari fitur mana saja.
+        unseen = np.argmin(seen, axis=1)
+        has_unseen = ~seen[np.arange(len(seen)), unseen]
+        row_bias = np.where(has_unseen, log_prob[np.arange(len(seen)), unseen], 0.0)
+        offsets = np.where(seen | ~has_unseen[:, None], log_prob - row_bias[:, None], 0.0)
+        return ArtifactModel("softmax", _sparse_weights(offsets), model.class_log_prior_.astype(np.float32),
+                             model.classes_, row_bias.astype(np.float32))
+    if hasattr(model, "coef_") and hasattr(model, "predict_proba"):
+        if model.coef_.shape[0] == 1:
+            kind = "binary"
+        elif isinstance(model, linear_model.SGDClassifier):
+            kind = "ovr"
+        else:
+            kind = "softmax"
+        return ArtifactModel(kind, _sparse_weights(model.coef_),
+                             np.asarray(model.intercept_, dtype=np.float32), model.classes_)
+    return None
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _version_dir(root: str, version: int) -> str:
+    return os.path.join(root, f"v{version:06d}")
+
+
+def list_versions(root: str = MODEL_ROOT) -> list:
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(root) if name.startswith("v") and name[1:].isdigit())
+
+
+def current_version(root: str = MODEL_ROOT) -> Optional[int]:
+    link = os.path.join(root, CURRENT_LINK)
+    if not os.path.islink(link):
+        return None
+    return int(os.path.basename(os.readlink(link))[1:])
+
+
+def _training_state(model) -> dict:
+    if isinstance(model, naive_bayes.MultinomialNB):
+        return {"feature_count": sparse.csr_matrix(model.feature_count_), "class_count": model.class_count_}
+    return {"coef": sparse.csr_matrix(model.coef_), "intercept": model.intercept_,
+            "t": np.array([getattr(model, "t_", 1.0)])}
+
+
+def publish(models: dict, vectorizer, root: str = MODEL_ROOT, keep: int = KEEP_VERSIONS) -> int:
+    """Write a new version directory and atomically repoint ``current`` at it."""
+    os.makedirs(root, exist_ok=True)
+    versions = list_versions(root)
+    version = (versions[-1] if versions else 0) + 1
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=root)
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created_at": time.time(),
+        "vectorizer": {
+            "type": "hashing",
+            "n_features": vectorizer.n_features,
+            "alternate_sign": vectorizer.alternate_sign,
+            "norm": vectorizer.norm,
+        },
+        "models": {},
+        "checksums": {},
+    }
+    try:
+        for model_name, model in models.items():
+            scorer = as_artifact_model(model)
+            if scorer is None:
+                continue
+            weights = scorer.weights
+            arrays = {"weights.data": weights.data, "weights.indices": weights.indices,
+                      "weights.indptr": weights.indptr, "bias": scorer.bias}
+            if scorer.row_bias is not None:
+                arrays["row_bias"] = scorer.row_bias
+            for suffix, array in arrays.items():
+                np.save(os.path.join(staging, f"{model_name}.{suffix}.npy"), array)
+            # Jawaban disimpan sebagai JSON: array unicode numpy memakai 4 byte x jawaban terpanjang per kelas.
+            with open(os.path.join(staging, f"{model_name}.classes.json"), "w", encoding='utf-8') as f:
+                json.dump([str(label) for label in scorer.classes], f, ensure_ascii=False)
+            state = _training_state(model)
+            state_file = os.path.join(staging, f"{model_name}.state.npz")
+            with open(state_file, "wb") as f:
+                np.savez_compressed(f, **{key: value for key, value in state.items() if not sparse.issparse(value)})
+            for key, value in state.items():
+                if sparse.issparse(value):
+                    sparse.save_npz(os.path.join(staging, f"{model_name}.{key}.npz"), value)
+            manifest["models"][model_name] = {"kind": scorer.kind, "estimator": type(model).__name__,
+                                              "shape": list(weights.shape), "nnz": int(weights.nnz)}
+
+        for name in sorted(os.listdir(staging)):
+            manifest["checksums"][name] = _sha256(os.path.join(staging, name))
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+
+        target = _version_dir(root, version)
+        os.rename(staging, target)
+        link = os.path.join(root, CURRENT_LINK)
+        tmp_link = f"{link}.{os.getpid()}.tmp"
+        os.symlink(os.path.basename(target), tmp_link)
+        os.replace(tmp_link, link)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    for old in list_versions(root)[:-keep]:
+        shutil.rmtree(_version_dir(root, old), ignore_errors=True)
+    return version
+
+
+def load(root: str = MODEL_ROOT, version: int = None, mmap: bool = True, verify: bool = True) -> ModelArtifact:
+    """Open a published version (default ``current``) with weights memory-mapped read-only."""
+    if version is None:
+        version = current_version(root)
+        if version is None:
+            raise ArtifactError(f"Belum ada versi model di {root}")
+    path = _version_dir(root, version)
+    with open(os.path.join(path, MANIFEST_FILE), "r", encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("format") not in SUPPORTED_FORMATS:
+        raise ArtifactError(f"Format artefak {manifest.get('format')} tidak didukung")
+    if verify:
+        for name, checksum in manifest["checksums"].items():
+            if _sha256(os.path.join(path, name)) != checksum:
+                raise ArtifactError(f"Checksum {name} pada versi {version} tidak cocok")
+
+    mmap_mode = "r" if mmap else None
+    models = {}
+    for model_name, meta in manifest["models"].items():
+        prefix = os.path.join(path, model_name)
+        if manifest["format"] == 1:
+            weights = np.load(f"{prefix}.weights.npy", mmap_mode=mmap_mode)
+            classes = np.load(f"{prefix}.classes.npy")
+            row_bias = None
+        else:
+            with open(f"{prefix}.classes.json", "r", encoding='utf-8') as f:
+                classes = np.asarray(json.load(f), dtype=object)
+            weights = sparse.csr_matrix((np.load(f"{prefix}.weights.data.npy", mmap_mode=mmap_mode),
+                                         np.load(f"{prefix}.weights.indices.npy", mmap_mode=mmap_mode),
+                                         np.load(f"{prefix}.weights.indptr.npy", mmap_mode=mmap_mode)),
+                                        shape=tuple(meta["shape"]), copy=False)
+            row_bias = np.load(f"{prefix}.row_bias.npy") if os.path.exists(f"{prefix}.row_bias.npy") else None
+        models[model_name] = ArtifactModel(meta["kind"], weights, np.load(f"{prefix}.bias.npy"), classes, row_bias)
+    params = manifest["vectorizer"]
+    vectorizer = sklearn_text.HashingVectorizer(n_features=params["n_features"],
+                                                alternate_sign=params["alternate_sign"], norm=params["norm"])
+    return ModelArtifact(version, path, vectorizer, models, manifest)
+
+
+def load_training_state(estimators: dict, root: str = MODEL_ROOT) -> Optional[dict]:
+    """Restore fresh ``estimators`` in place from the ``current`` version so partial_fit can resume.
+
+    Returns None when nothing has been published yet. Naive Bayes is rebuilt
+    through sklearn's private update helpers; tests/test_trainer.py covers it.
+    """
+    try:
+        artifact = load(root, mmap=False)
+    except (ArtifactError, OSError, ValueError) as e:
+        logger.info(f"Status pelatihan belum tersedia: {e}")
+        return None
+
+    n_features = artifact.manifest["vectorizer"]["n_features"]
+    for model_name, model in estimators.items():
+        if model_name not in artifact.models:
+            continue
+        prefix = os.path.join(artifact.path, model_name)
+        state = np.load(f"{prefix}.state.npz")
+        model.classes_ = artifact.models[model_name].classes.astype(object)
+        model.n_features_in_ = n_features
+        if isinstance(model, naive_bayes.MultinomialNB):
+            model.feature_count_ = sparse.load_npz(f"{prefix}.feature_count.npz").toarray()
+            model.class_count_ = state["class_count"]
+            model._update_feature_log_prob(model._check_alpha())
+            model._update_class_log_prior()
+        else:
+            model.coef_ = sparse.load_npz(f"{prefix}.coef.npz").toarray()
+            model.intercept_ = state["intercept"]
+            model.t_ = float(state["t"][0])
+    return estimators
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from itertools import islice
+import numpy as np
+import model_artifacts
+from training_log import iter_pairs
+
+logger = logging.getLogger(__name__)
+
+MODEL_POLL_INTERVAL = 10  # detik
+GOLDEN_SET_FILE = os.getenv("GOLDEN_SET_FILE", "golden_set.jsonl")
+GOLDEN_SET_SIZE = 50
+GOLDEN_TOLERANCE = 0.05
+
+
+def load_golden_set(path=GOLDEN_SET_FILE, fallback_log=None, size=GOLDEN_SET_SIZE) -> list:
+    """Read ``(query, answer)`` pairs from ``path``; without it, use the oldest pairs of the training log."""
+    if os.path.exists(path):
+        return list(iter_pairs(path))
+    if fallback_log:
+        return list(dict(islice(iter_pairs(fallback_log), size)).items())
+    return []
+
+
+def golden_accuracy(artifact: model_artifacts.ModelArtifact, golden: list) -> float:
+    """Top-1 accuracy of the artifact's best model on the golden pairs."""
+    if not golden:
+        return 1.0
+    X = artifact.vectorizer.transform([query for query, _ in golden])
+    expected = np.asarray([answer for _, answer in golden])
+    best = 0.0
+    for model in artifact.models.values():
+        scores = model.scores(X)
+        if not np.isfinite(scores).all():
+            raise model_artifacts.ArtifactError("Skor model tidak hingga")
+        if model.kind == "binary":
+            predicted = model.classes[(scores[:, 0] > 0).astype(int)]
+        else:
+            predicted = model.classes[scores.argmax(axis=1)]
+        best = max(best, float((predicted == expected).mean()))
+    return best
+
+
+class ModelRegistry:
+    """Keeps the active model version and swaps in new ones while the bot runs.
+
+    A new version is noticed through :meth:`notify` (the trainer), by polling
+    the ``current`` link every ``poll_interval`` seconds, or on SIGHUP. It is
+    loaded and checksummed in a worker thread and scored on the golden set,
+    and only replaces the active version if its accuracy is no more than
+    ``tolerance`` below it. ``on_swap(artifact)`` then runs on the event loop.
+    Handlers holding the previous artifact keep using it; its memory maps are
+    released once the last reference is gone.
+    """
+
+    def __init__(self, on_swap, root=model_artifacts.MODEL_ROOT, golden=(), poll_interval=MODEL_POLL_INTERVAL,
+                 tolerance=GOLDEN_TOLERANCE):
+        self.on_swap = on_swap
+        self.root = root
+        self.golden = list(golden)
+        self.poll_interval = poll_interval
+        self.tolerance = tolerance
+        self.active = None
+        self.stats = {"version": None, "golden_accuracy": None, "reloads": 0, "rejected": 0, "failed": 0,
+                      "last_reload_ms": None, "max_reload_ms": 0.0}
+        self._rejected = set()
+        self._lock = None
+        self._task = None
+        self._loop = None
+        self._reloads = set()  # task dari notify(); referensinya disimpan agar tidak dibuang GC
+
+    @property
+    def version(self):
+        return self.active.version if self.active else None
+
+    async def start(self) -> None:
+        """Load the current version, then watch for new ones."""
+        self._loop = asyncio.get_running_loop()
+        self._lock = asyncio.Lock()
+        await self.reload()
+        self._task = self._loop.create_task(self._watch())
+        try:
+            self._loop.add_signal_handler(signal.SIGHUP, self.notify)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass  # tidak ada SIGHUP (Windows) atau bukan thread utama
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        try:
+            self._loop.remove_signal_handler(signal.SIGHUP)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass
+        self._task.cancel()
+        for task in self._reloads:
+            task.cancel()
+        await asyncio.gather(self._task, *self._reloads, return_exceptions=True)
+        self._task = None
+
+    def notify(self, version: int = None) -> None:
+        """Schedule a reload of ``version`` (default: whatever ``current`` points to)."""
+        if self._loop is not None:
+            task = self._loop.create_task(self.reload(version))
+            self._reloads.add(task)
+            task.add_done_callback(self._reloads.discard)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            version = model_artifacts.current_version(self.root)
+            if version is not None and version != self.version and version not in self._rejected:
+                await self.reload(version)
+
+    def _load(self, version):
+        artifact = model_artifacts.load(self.root, version)
+        return artifact, golden_accuracy(artifact, self.golden)
+
+    async def reload(self, version: int = None) -> bool:
+        """Load, validate and activate a version; returns True if it was swapped in.
+
+        Errors are logged and counted in ``stats["failed"]``, never raised.
+        """
+        async with self._lock:
+            if version is None:
+                version = model_artifacts.current_version(self.root)
+            if version is None or version == self.version:
+                return False
+
+            started = time.perf_counter()
+            try:
+                artifact, accuracy = await self._loop.run_in_executor(None, self._load, version)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Kesalahan memuat model versi {version}: {type(e).__name__} {e}")
+                return False
+
+            baseline = self.stats["golden_accuracy"]
+            if baseline is not None and accuracy < baseline - self.tolerance:
+                self.stats["rejected"] += 1
+                self._rejected.add(version)
+                logger.warning(f"Model versi {version} ditolak: akurasi golden {accuracy:.2f} < {baseline:.2f}")
+                return False
+
+            previous = self.active
+            try:
+                self.on_swap(artifact)
+            except Exception:
+                self.stats["failed"] += 1
+                logger.exception(f"Kesalahan mengaktifkan model versi {version}")
+                return False
+            self.active = artifact
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats.update(version=version, golden_accuracy=accuracy, last_reload_ms=elapsed_ms,
+                              max_reload_ms=max(self.stats["max_reload_ms"], elapsed_ms))
+            self.stats["reloads"] += 1
+            logger.info(f"Model versi {version} aktif (akurasi golden {accuracy:.2f}, {elapsed_ms:.1f} ms, "
+                        f"sebelumnya {previous.version if previous else '-'})")
+            return True
@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import sqlite3
+from collections import defaultdict
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+STATE_DB_FILE = os.getenv("STATE_DB_FILE", "state.db")
+PERSISTENCE_INTERVAL = float(os.getenv("PERSISTENCE_INTERVAL", "10"))  # detik
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+
+_MISSING = object()
+
+
+class SQLitePersistence(BasePersistence):
+    """Stores ``user_data`` and ``chat_data`` as JSON rows in a shared SQLite file.
+
+    Rows are written one user or chat at a time, so several shard processes
+    can share the file (WAL mode) without overwriting each other's chats.
+    ``bot_data`` is not persisted because shards would race on its single row.
+
+    Shards are picked by chat, so one user's ``user_data`` can be changed by
+    several shards (their private chat and any groups). A user row is
+    therefore merged key by key: only the keys this process changed since it
+    last read the row are written, inside one write transaction. Changes
+    from other shards are pulled in before each update is handled.
+    """
+
+    def __init__(self, path=STATE_DB_FILE, update_interval=PERSISTENCE_INTERVAL):
+        super().__init__(store_data=PersistenceInput(bot_data=False, callback_data=False),
+                         update_interval=update_interval)
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._user_rows = {}  # user_id -> isi baris terakhir yang dibaca/ditulis proses ini
+
+    def _load(self, kind: str) -> dict:
+        data = defaultdict(dict)
+        for row_id, payload in self._db.execute("SELECT id, data FROM state WHERE kind = ?", (kind,)):
+            data[row_id] = json.loads(payload)
+        return data
+
+    def _row(self, kind: str, row_id: int):
+        row = self._db.execute("SELECT data FROM state WHERE kind = ? AND id = ?", (kind, row_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _store(self, kind: str, row_id: int, data: dict) -> None:
+        try:
+            payload = json.dumps(data, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Data {kind} {row_id} tidak bisa disimpan: {e}")
+            return
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO state (kind, id, data) VALUES (?, ?, ?)", (kind, row_id, payload))
+
+    def _drop(self, kind: str, row_id: int) -> None:
+        with self._db:
+            self._db.execute("DELETE FROM state WHERE kind = ? AND id = ?", (kind, row_id))
+
+    async def get_user_data(self) -> dict:
+        data = self._load("user")
+        self._user_rows = {user_id: json.loads(json.dumps(row)) for user_id, row in data.items()}
+        return data
+
+    async def get_chat_data(self) -> dict:
+        return self._load("chat")
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = self._db.execute("SELECT key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        try:
+            data = json.loads(json.dumps(data, ensure_ascii=False))  # bandingkan dalam bentuk JSON
+        except (TypeError, ValueError) as e:
+            logger.error(f"Data user {user_id} tidak bisa disimpan: {e}")
+            return
+        base = self._user_rows.get(user_id, {})
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            merged = self._row("user", user_id) or {}
+            merged.update({key: value for key, value in data.items() if key not in base or base[key] != value})
+            for key in base.keys() - data.keys():
+                merged.pop(key, None)
+            self._db.execute("INSERT OR REPLACE INTO state (kind, id, data) VALUES (?, ?, ?)",
+                             ("user", user_id, json.dumps(merged, ensure_ascii=False)))
+        self._user_rows[user_id] = merged
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._store("chat", chat_id, data)
+
+    async def update_bot_data(self, data) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        with self._db:
+            if new_state is None:
+                self._db.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, json.dumps(key)))
+            else:
+                self._db.execute("INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                                 (name, json.dumps(key), json.dumps(new_state)))
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._drop("user", user_id)
+        self._user_rows.pop(user_id, None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._drop("chat", chat_id)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        """Apply keys another shard changed since this process last read the row."""
+        row = self._row("user", user_id)
+        if row is None:
+            return
+        base = self._user_rows.get(user_id, {})
+        if row == base:
+            return
+        for key, value in row.items():
+            if base.get(key, _MISSING) != value:
+                user_data[key] = value
+        for key in base.keys() - row.keys():
+            user_data.pop(key, None)
+        self._user_rows[user_id] = row
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data) -> None:
+        pass
+
+    async def flush(self) -> None:
+        self._db.close()
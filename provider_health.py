@@ -0,0 +1,219 @@
+"""Circuit breakers and latency-based timeouts for upstream providers.
+
+    python provider_health.py    # demo against a local stub server
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # detik sebelum probe half-open
+BREAKER_MAX_TIMEOUT = float(os.getenv("BREAKER_MAX_TIMEOUT", os.getenv("HTTP_TIMEOUT", "5")))
+BREAKER_MIN_TIMEOUT = float(os.getenv("BREAKER_MIN_TIMEOUT", "0.5"))
+TIMEOUT_FACTOR = 2.0  # timeout = p95 x faktor ini
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+DISABLED = "disabled"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+
+class ProviderHealth:
+    """Circuit breaker with an adaptive timeout for one upstream.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    :meth:`call` raises CircuitOpen without touching the network. After
+    ``reset_timeout`` seconds one probe is let through (half-open): success
+    closes the breaker, failure opens it again. Only the probe call releases
+    the probe slot, and calls that started before the breaker opened do not
+    change its state when they finish late. The timeout handed to the
+    call is the p95 of recent successful latencies times TIMEOUT_FACTOR,
+    clamped to ``[min_timeout, max_timeout]``. A provider that can never
+    work (e.g. no API key) is :meth:`disable`-d and always fails fast.
+    """
+
+    def __init__(self, name: str, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT,
+                 min_timeout=BREAKER_MIN_TIMEOUT, max_timeout=BREAKER_MAX_TIMEOUT, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.stats = {"calls": 0, "successes": 0, "failures": 0, "timeouts": 0, "fast_fails": 0,
+                      "opened": 0, "probes": 0}
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._generation = 0  # naik tiap kali breaker terbuka
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._timeout = max_timeout
+
+    def disable(self, reason: str) -> None:
+        self.state = DISABLED
+        logger.warning(f"Penyedia {self.name} dinonaktifkan: {reason}")
+
+    @property
+    def available(self) -> bool:
+        """Whether a call would be attempted now (does not reserve the half-open probe)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.clock() - self._opened_at >= self.reset_timeout
+        if self.state == HALF_OPEN:
+            return not self._probing
+        return False
+
+    def timeout(self) -> float:
+        return self._timeout
+
+    def p95(self):
+        if len(self._latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(len(ordered) * 0.95)]
+
+    def _allow(self) -> bool:
+        if not self.available:
+            return False
+        if self.state != CLOSED:
+            self.state = HALF_OPEN
+            self._probing = True
+            self.stats["probes"] += 1
+        return True
+
+    def _success(self, latency: float, generation: int) -> None:
+        self.stats["successes"] += 1
+        self._latencies.append(latency)
+        p95 = self.p95()
+        if p95 is not None:
+            self._timeout = min(self.max_timeout, max(self.min_timeout, p95 * TIMEOUT_FACTOR))
+        if generation != self._generation:
+            return  # dimulai sebelum breaker terbuka: bukan bukti pemulihan
+        self._failures = 0
+        if self.state == HALF_OPEN:
+            logger.info(f"Penyedia {self.name} pulih, breaker ditutup")
+        self.state = CLOSED
+
+    def _failure(self, generation: int) -> None:
+        self.stats["failures"] += 1
+        if generation != self._generation:
+            return
+        self._failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+            self.state = OPEN
+            self._generation += 1
+            self._opened_at = self.clock()
+            self.stats["opened"] += 1
+            logger.warning(f"Breaker {self.name} terbuka setelah {self._failures} kegagalan; "
+                           f"dicoba lagi dalam {self.reset_timeout:.0f} detik")
+
+    async def call(self, func, *args, **kwargs):
+        """``await func(*args, **kwargs, timeout=...)`` guarded by the breaker.
+
+        Any exception from ``func`` counts as a failure and is re-raised;
+        asyncio.TimeoutError is raised when the adaptive timeout elapses.
+        """
+        was_probing = self._probing
+        if not self._allow():
+            self.stats["fast_fails"] += 1
+            raise CircuitOpen(f"Penyedia {self.name} sedang tidak tersedia")
+        # Hanya panggilan yang memesan probe half-open yang boleh melepasnya.
+        is_probe = self._probing and not was_probing
+        generation = self._generation
+        self.stats["calls"] += 1
+        timeout = self._timeout
+        started = self.clock()
+        try:
+            # Batas waktu dijaga dua kali: oleh klien HTTP dan oleh wait_for untuk fungsi lain.
+            result = await asyncio.wait_for(func(*args, **kwargs, timeout=timeout), timeout)
+        except asyncio.CancelledError:
+            raise  # pemanggil yang membatalkan bukan kesalahan penyedia
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            self._failure(generation)
+            raise
+        except Exception:
+            self._failure(generation)
+            raise
+        else:
+            self._success(self.clock() - started, generation)
+            return result
+        finally:
+            if is_probe:
+                self._probing = False
+
+
+async def _stub_server(mode: dict):
+    """Minimal HTTP server answering JSON after ``mode["delay"]`` with ``mode["status"]``."""
+    async def handle(reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            await asyncio.sleep(mode["delay"])
+            body = b'{"ok": true}'
+            writer.write(f"HTTP/1.1 {mode['status']} X\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.CancelledError, ConnectionError, asyncio.IncompleteReadError):
+            pass  # klien sudah menyerah (timeout)
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def _demo() -> None:
+    import http_client
+
+    mode = {"delay": 0.02, "status": 200}
+    server = await _stub_server(mode)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+    health = ProviderHealth("stub", failure_threshold=3, reset_timeout=1)
+
+    async def attempt():
+        started = time.perf_counter()
+        try:
+            await health.call(http_client.fetch_json, url)
+            outcome = "ok"
+        except CircuitOpen:
+            outcome = "fast-fail"
+        except Exception as e:
+            outcome = type(e).__name__
+        return outcome, (time.perf_counter() - started) * 1000
+
+    def show(label, outcomes):
+        kinds = sorted({outcome for outcome, _ in outcomes})
+        worst = max(ms for _, ms in outcomes)
+        print(f"{label:<28} {kinds} maks {worst:7.1f} ms  state={health.state} timeout={health.timeout():.2f}s")
+
+    show("sehat, 20 ms", [await attempt() for _ in range(30)])
+    mode.update(status=503)
+    show("error 503", [await attempt() for _ in range(10)])
+    mode.update(status=200, delay=3)
+    await asyncio.sleep(1.1)
+    show("half-open, lambat 3 s", [await attempt() for _ in range(5)])
+    mode.update(delay=0.02)
+    await asyncio.sleep(1.1)
+    show("pulih", [await attempt() for _ in range(5)])
+    dead = ProviderHealth("bing")
+    dead.disable("BING_API_KEY tidak diisi")
+    health = dead
+    show("tanpa API key", [await attempt() for _ in range(5)])
+    print(dead.stats)
+    server.close()
+    await http_client.close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -0,0 +1,131 @@
+import re
+from array import array
+import numpy as np
+from fuzzywuzzy import fuzz, utils
+
+DEFAULT_TOP_K = 32
+DEFAULT_SCORE_CUTOFF = 70
+MAX_DF_RATIO = 0.2  # trigram yang muncul di >20% kunci tidak membantu menyaring
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", utils.full_process(text, force_ascii=False)).strip()
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class QAIndex:
+    """Trigram inverted index over qa_model keys.
+
+    ``match`` gives the same kind of answer as
+    ``process.extractOne(query, keys, score_cutoff=...)`` but only runs
+    ``fuzz.WRatio`` on the ``top_k`` keys whose trigrams are best contained in
+    the query, instead of on every key.
+    """
+
+    def __init__(self, keys=(), top_k=DEFAULT_TOP_K, score_cutoff=DEFAULT_SCORE_CUTOFF):
+        self.top_k = top_k
+        self.score_cutoff = score_cutoff
+        self.keys = []
+        self._normalized = []
+        self._sizes = array('f')
+        self._postings = {}
+        self._exact = {}
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key: str) -> None:
+        normalized = normalize(key)
+        if normalized in self._exact:
+            return
+        key_id = len(self.keys)
+        grams = trigrams(normalized)
+        self.keys.append(key)
+        self._normalized.append(normalized)
+        self._sizes.append(len(grams) or 1)
+        self._exact[normalized] = key_id
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('i')
+            posting.append(key_id)
+
+    def candidates(self, normalized_query: str) -> list:
+        postings = [self._postings[gram] for gram in trigrams(normalized_query) if gram in self._postings]
+        if not postings:
+            return []
+        max_df = max(1, int(len(self.keys) * MAX_DF_RATIO))
+        selective = [posting for posting in postings if len(posting) <= max_df] or postings
+        # Counting in numpy keeps the cost flat even when postings hold tens of thousands of ids.
+        # The buffer views must not outlive this call, otherwise add() cannot grow the arrays.
+        ids = np.concatenate([np.frombuffer(posting, dtype=np.int32) for posting in selective])
+        counts = np.bincount(ids, minlength=len(self.keys))
+        scores = counts / np.frombuffer(self._sizes, dtype=np.float32)
+        if len(scores) > self.top_k:
+            top = np.argpartition(scores, -self.top_k)[-self.top_k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[counts[top] > 0]
+        return top[np.argsort(-scores[top], kind="stable")].tolist()
+
+    def match(self, query: str):
+        """Return ``(key, score)`` for the best key scoring at least ``score_cutoff``, else None."""
+        normalized = normalize(query)
+        if not normalized:
+            return None
+        key_id = self._exact.get(normalized)
+        if key_id is not None:
+            return self.keys[key_id], 100
+
+        best = None
+        best_score = self.score_cutoff - 1
+        for key_id in self.candidates(normalized):
+            score = fuzz.WRatio(normalized, self._normalized[key_id], force_ascii=False, full_process=False)
+            # Seri dipecah ke kunci yang lebih dulu ditambahkan, sama seperti extractOne.
+            if score > best_score or (best is not None and score == best_score and key_id < best):
+                best, best_score = key_id, score
+        if best is None:
+            return None
+        return self.keys[best], best_score
+
+
+if __name__ == "__main__":
+    # Benchmark: python qa_index.py
+    import random
+    import time
+    from fuzzywuzzy import process
+
+    random.seed(0)
+    words = ["apa", "siapa", "kapan", "bagaimana", "kenapa", "ibu", "kota", "presiden", "negara", "makanan",
+             "musik", "film", "cuaca", "hari", "ini", "besok", "teknologi", "sejarah", "indonesia", "jepang",
+             "bahasa", "olahraga", "sepak", "bola", "harga", "emas", "resep", "nasi", "goreng", "lagu"]
+    syllables = [c + v for c in "bcdfghjklmnprstwy" for v in "aiueo"]
+    words += ["".join(random.choices(syllables, k=random.randint(2, 4))) for _ in range(20000)]
+
+    for size in (10_000, 100_000):
+        keys = list({" ".join(random.choices(words, k=random.randint(2, 6))) for _ in range(size)})
+        started = time.perf_counter()
+        index = QAIndex(keys)
+        build = time.perf_counter() - started
+        queries = [random.choice(keys) + " ya" for _ in range(50)]
+
+        started = time.perf_counter()
+        for query in queries:
+            index.match(query)
+        indexed = (time.perf_counter() - started) / len(queries)
+
+        sample = queries[:3]
+        started = time.perf_counter()
+        for query in sample:
+            process.extractOne(query, keys, score_cutoff=DEFAULT_SCORE_CUTOFF)
+        linear = (time.perf_counter() - started) / len(sample)
+        print(f"{len(keys):>7} kunci: build {build:.2f}s, indeks {indexed * 1000:.2f} ms/kueri, "
+              f"extractOne {linear * 1000:.1f} ms/kueri")
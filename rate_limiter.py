@@ -0,0 +1,238 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from collections import deque
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_GLOBAL = float(os.getenv("RATE_LIMIT_GLOBAL", "30"))  # pesan per detik untuk seluruh bot
+RATE_LIMIT_PER_CHAT = float(os.getenv("RATE_LIMIT_PER_CHAT", "1"))  # pesan per detik per chat pribadi
+RATE_LIMIT_GROUP_PER_MINUTE = float(os.getenv("RATE_LIMIT_GROUP_PER_MINUTE", "20"))
+RATE_LIMIT_CHAT_BURST = int(os.getenv("RATE_LIMIT_CHAT_BURST", "1"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+RATE_LIMIT_MAX_QUEUE = int(os.getenv("RATE_LIMIT_MAX_QUEUE", "500"))
+MAX_TRACKED_CHATS = 10000
+
+# Jalur prioritas: angka kecil dikirim lebih dulu.
+PRIORITY_COMMAND = 0
+PRIORITY_REPLY = 1
+PRIORITY_BACKGROUND = 2
+LANES = (PRIORITY_COMMAND, PRIORITY_REPLY, PRIORITY_BACKGROUND)
+BACKGROUND_ENDPOINTS = {"sendVoice", "sendAudio", "sendDocument", "sendPhoto", "sendChatAction"}
+
+current_priority = contextvars.ContextVar("current_priority", default=None)
+
+
+def with_priority(priority: int, callback):
+    """Run ``callback(update, context)`` with its outbound calls in the ``priority`` lane."""
+    @functools.wraps(callback)
+    async def prioritized(update, context):
+        token = current_priority.set(priority)
+        try:
+            return await callback(update, context)
+        finally:
+            current_priority.reset(token)
+    return prioritized
+
+
+class TokenBucket:
+    """``rate`` tokens per second up to ``capacity``; time is passed in by the caller."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self, now: float) -> bool:
+        if self.delay(now) > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    def block(self, until: float) -> None:
+        self.blocked_until = max(self.blocked_until, until)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+
+class _Pending:
+    __slots__ = ("chat_id", "future", "queued_at")
+
+    def __init__(self, chat_id, future, queued_at):
+        self.chat_id = chat_id
+        self.future = future
+        self.queued_at = queued_at
+
+
+class TelegramRateLimiter(BaseRateLimiter):
+    """Token-bucket send scheduler for ``ApplicationBuilder().rate_limiter(...)``.
+
+    Every call with a ``chat_id`` waits for a token from the global bucket
+    (~30 msg/s) and from its chat's bucket (~1 msg/s, 20/min for groups).
+    Waiting calls sit in priority lanes: command replies, then ordinary
+    replies, then voice and other uploads. A lane is FIFO per chat, and a
+    chat that is still throttled does not hold back other chats behind it.
+    On ``RetryAfter`` the chat is paused for the advertised time and the
+    call is re-queued, up to ``max_retries`` times.
+
+    The lane comes from ``rate_limit_args={"priority": n}``, else from
+    :func:`with_priority` around the handler, else from the endpoint.
+    """
+
+    def __init__(self, global_rate=RATE_LIMIT_GLOBAL, chat_rate=RATE_LIMIT_PER_CHAT,
+                 group_rate=RATE_LIMIT_GROUP_PER_MINUTE / 60, chat_burst=RATE_LIMIT_CHAT_BURST,
+                 max_retries=RATE_LIMIT_MAX_RETRIES, max_queue=RATE_LIMIT_MAX_QUEUE):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+        self.stats = {"sent": 0, "queued": 0, "retry_after": 0, "retries": 0, "gave_up": 0,
+                      "max_depth": 0, "max_wait_ms": 0.0}
+        self._lanes = {lane: deque() for lane in LANES}
+        self._chats = {}
+        self._global = None
+        self._arrival = None
+        self._dispatcher = None
+
+    @property
+    def depth(self) -> dict:
+        """Number of calls waiting in each lane."""
+        return {lane: len(queue) for lane, queue in self._lanes.items()}
+
+    def saturated(self) -> bool:
+        return sum(map(len, self._lanes.values())) >= self.max_queue
+
+    async def initialize(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._global = TokenBucket(self.global_rate, self.global_rate, loop.time())
+            self._arrival = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for queue in self._lanes.values():
+            while queue:
+                queue.popleft().future.cancel()
+        logger.info(f"Statistik pembatas laju: {self.stats}")
+
+    def _bucket(self, chat_id, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_TRACKED_CHATS:
+                self._chats = {key: value for key, value in self._chats.items() if not value.idle(now)}
+            group = isinstance(chat_id, str) or chat_id < 0
+            bucket = self._chats[chat_id] = TokenBucket(self.group_rate if group else self.chat_rate,
+                                                        self.chat_burst, now)
+        return bucket
+
+    def _priority(self, endpoint: str, rate_limit_args) -> int:
+        if isinstance(rate_limit_args, dict) and "priority" in rate_limit_args:
+            return rate_limit_args["priority"]
+        priority = current_priority.get()
+        if priority is not None:
+            return priority
+        return PRIORITY_BACKGROUND if endpoint in BACKGROUND_ENDPOINTS else PRIORITY_REPLY
+
+    def _pick(self, now: float):
+        """Pop the first waiting call whose chat has a token; else return the shortest wait."""
+        shortest = None
+        for queue in self._lanes.values():
+            blocked = set()
+            for position, pending in enumerate(queue):
+                if pending.future.done():
+                    continue  # pemanggil sudah dibatalkan; dibersihkan di bawah
+                if pending.chat_id in blocked:
+                    continue
+                wait = self._bucket(pending.chat_id, now).delay(now)
+                if wait <= 0:
+                    del queue[position]
+                    return pending, 0.0
+                blocked.add(pending.chat_id)
+                shortest = wait if shortest is None else min(shortest, wait)
+            while queue and queue[0].future.done():
+                queue.popleft()
+        return None, shortest
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            wait = self._global.delay(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            pending, wait = self._pick(now)
+            if pending is None:
+                self._arrival.clear()
+                try:
+                    await asyncio.wait_for(self._arrival.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._global.take(now)
+            self._bucket(pending.chat_id, now).take(now)
+            self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], (now - pending.queued_at) * 1000)
+            pending.future.set_result(None)
+
+    async def _acquire(self, chat_id, priority: int) -> None:
+        if self._dispatcher is None:
+            await self.initialize()
+        loop = asyncio.get_running_loop()
+        pending = _Pending(chat_id, loop.create_future(), loop.time())
+        queue = self._lanes.get(priority, self._lanes[PRIORITY_BACKGROUND])
+        queue.append(pending)
+        self.stats["queued"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], sum(map(len, self._lanes.values())))
+        self._arrival.set()
+        await pending.future
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            # Bukan pesan ke chat (getMe, answerCallbackQuery, setWebhook, ...): tidak dibatasi.
+            return await callback(*args, **kwargs)
+
+        priority = self._priority(endpoint, rate_limit_args)
+        attempt = 0
+        while True:
+            await self._acquire(chat_id, priority)
+            try:
+                result = await callback(*args, **kwargs)
+                self.stats["sent"] += 1
+                return result
+            except RetryAfter as e:
+                self.stats["retry_after"] += 1
+                loop = asyncio.get_running_loop()
+                self._bucket(chat_id, loop.time()).block(loop.time() + e.retry_after)
+                if attempt >= self.max_retries:
+                    self.stats["gave_up"] += 1
+                    raise
+                attempt += 1
+                self.stats["retries"] += 1
+                logger.warning(f"Flood limit di chat {chat_id}, coba lagi setelah {e.retry_after} detik")
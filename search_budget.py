@@ -0,0 +1,242 @@
+import asyncio
+import calendar
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from provider_health import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BUDGET_DB_FILE = os.getenv("SEARCH_BUDGET_DB_FILE", "search_budget.db")
+BING_MONTHLY_QUOTA = int(os.getenv("BING_MONTHLY_QUOTA", "1000"))  # 0 = tanpa batas
+BING_PRICE_PER_1000 = float(os.getenv("BING_PRICE_PER_1000", "15"))  # USD per 1000 transaksi
+BING_RESERVE_FRACTION = float(os.getenv("BING_RESERVE_FRACTION", "0.2"))
+BING_PACE_SLACK = float(os.getenv("BING_PACE_SLACK", "0.05"))  # boleh mendahului jadwal sebesar ini
+SEARCH_BUDGET_PLAN_TTL = float(os.getenv("SEARCH_BUDGET_PLAN_TTL", "10"))  # detik; klaim tetap dicek di SQLite
+
+# Rencana pencarian untuk satu pertanyaan.
+NORMAL = "normal"        # Bing dan Wikipedia paralel, Bing diutamakan
+FRUGAL = "frugal"        # cache, lalu Wikipedia, Bing hanya dari cadangan bila keduanya kosong
+EXHAUSTED = "exhausted"  # kuota habis: cache dan Wikipedia saja
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_budget (
+    period TEXT NOT NULL,
+    counter TEXT NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, counter)
+);
+"""
+_INCREMENT = ("INSERT INTO search_budget (period, counter, value) VALUES (?, ?, ?) "
+              "ON CONFLICT (period, counter) DO UPDATE SET value = value + excluded.value")
+_SELECT = "SELECT value FROM search_budget WHERE period = ? AND counter = ?"
+_SELECT_PERIOD = "SELECT counter, value FROM search_budget WHERE period = ?"
+
+# True saat pencarian Bing boleh memakai cadangan kuota (diatur oleh pemanggil, seperti prioritas rate limiter).
+from_reserve = contextvars.ContextVar("from_reserve", default=False)
+
+
+class BudgetExhausted(CircuitOpen):
+    """Raised instead of calling Bing when no transaction is left in the pool being drawn from."""
+
+
+class SearchBudget:
+    """Monthly Bing quota, paced across the month and persisted in SQLite.
+
+    Spend is allowed to track a straight line from 0 to ``quota * (1 - reserve)``
+    over the calendar month (UTC), plus ``slack``. Ahead of that line, or
+    once only the reserve is left, the plan turns FRUGAL: the cache and the
+    free Wikipedia API are tried first and the reserve is spent only on
+    questions nothing else could answer. At the quota the plan is EXHAUSTED.
+    Counters live in a shared database, so restarts and shard processes
+    draw from one budget. Every transaction is claimed with :meth:`claim`
+    in a single write transaction before the request goes out, so
+    concurrent lookups cannot overshoot the quota or the reserve.
+
+    The database may be locked by another shard for a while, so the event
+    loop only uses the ``*_async`` methods, which run the blocking ones in
+    the default executor; :meth:`plan_async` reuses a plan for ``plan_ttl``
+    seconds. :meth:`avoided` only counts in memory and is written with the
+    next claim, plan or report.
+    """
+
+    def __init__(self, path=SEARCH_BUDGET_DB_FILE, quota=BING_MONTHLY_QUOTA, price_per_1000=BING_PRICE_PER_1000,
+                 reserve=BING_RESERVE_FRACTION, slack=BING_PACE_SLACK, plan_ttl=SEARCH_BUDGET_PLAN_TTL,
+                 clock=time.time):
+        self.path = path
+        self.quota = quota
+        self.price_per_1000 = price_per_1000
+        self.reserve = reserve
+        self.slack = slack
+        self.plan_ttl = plan_ttl
+        self.clock = clock
+        self._plan = None
+        self._plan_at = 0.0
+        self._lock = threading.Lock()  # satu koneksi, dipakai bergantian oleh thread executor
+        self._db = None  # dibuka saat pertama dipakai, bukan saat modul bot diimpor
+        self._avoided_lock = threading.Lock()
+        self._avoided = Counter()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._flush_avoided_locked(self._period(self.clock()))
+                self._db.close()
+                self._db = None
+
+    def _period(self, now: float) -> str:
+        return time.strftime("%Y-%m", time.gmtime(now))
+
+    def _elapsed(self, now: float) -> float:
+        """Fraction of the current month that has passed."""
+        t = time.gmtime(now)
+        days = calendar.monthrange(t.tm_year, t.tm_mon)[1]
+        seconds = (t.tm_mday - 1) * 86400 + t.tm_hour * 3600 + t.tm_min * 60 + t.tm_sec
+        return seconds / (days * 86400)
+
+    def _flush_avoided_locked(self, period: str) -> None:
+        with self._avoided_lock:
+            pending, self._avoided = self._avoided, Counter()
+        if pending:
+            self._connection().executemany(_INCREMENT, [(period, f"avoided_{reason}", amount)
+                                                        for reason, amount in pending.items()])
+
+    def _counters_locked(self, period: str) -> dict:
+        self._flush_avoided_locked(period)
+        return dict(self._connection().execute(_SELECT_PERIOD, (period,)).fetchall())
+
+    def used(self) -> int:
+        with self._lock:
+            row = self._connection().execute(_SELECT, (self._period(self.clock()), "bing")).fetchone()
+        return row[0] if row else 0
+
+    def _limits(self) -> tuple:
+        """(spendable, reserve) transactions per month; together exactly ``quota``."""
+        reserve = int(self.quota * self.reserve)
+        return self.quota - reserve, reserve
+
+    def claim(self, reserve: bool = False) -> bool:
+        """Take one Bing transaction right before the request goes out; False if none is left.
+
+        It comes from the spendable part of the quota, or from the reserve
+        when ``reserve`` is set. A refused claim is counted as avoided.
+        Blocking; use :meth:`claim_async` from the event loop.
+        """
+        period = self._period(self.clock())
+        with self._lock:
+            db = self._connection()
+            if self.quota <= 0:
+                db.execute(_INCREMENT, (period, "bing", 1))
+                return True
+            spendable, reserve_limit = self._limits()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                counters = self._counters_locked(period)
+                used, reserve_used = counters.get("bing", 0), counters.get("reserve", 0)
+                if reserve:
+                    claimed = reserve_used < reserve_limit and used < self.quota
+                    if claimed:
+                        db.execute(_INCREMENT, (period, "reserve", 1))
+                else:
+                    claimed = used - reserve_used < spendable
+                db.execute(_INCREMENT, (period, "bing" if claimed else "avoided_exhausted", 1))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def refund(self, reserve: bool = False) -> None:
+        """Give back a claimed transaction whose request was never sent."""
+        period = self._period(self.clock())
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(_INCREMENT, (period, "bing", -1))
+                if reserve:
+                    db.execute(_INCREMENT, (period, "reserve", -1))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    async def claim_async(self) -> bool:
+        """:meth:`claim` in the executor, from the reserve inside ``from_reserve``."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.claim, from_reserve.get())
+
+    async def refund_async(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.refund, from_reserve.get())
+
+    def avoided(self, reason: str) -> None:
+        """Record a question answered (or given up) without Bing because of the budget."""
+        with self._avoided_lock:
+            self._avoided[reason] += 1
+
+    def _decide(self, counters: dict, now: float) -> str:
+        used, reserve_used = counters.get("bing", 0), counters.get("reserve", 0)
+        spendable, reserve = self._limits()
+        if used >= self.quota or reserve_used >= reserve and used - reserve_used >= spendable:
+            plan = EXHAUSTED
+        elif used >= spendable or used >= spendable * self._elapsed(now) + self.quota * self.slack:
+            plan = FRUGAL
+        else:
+            plan = NORMAL
+        if plan != self._plan:
+            if self._plan is not None:
+                logger.info(f"Rencana pencarian Bing berubah: {self._plan} -> {plan} ({used}/{self.quota} transaksi)")
+            self._plan = plan
+        self._plan_at = now
+        return plan
+
+    def plan(self) -> str:
+        """Current plan read from the database (blocking); see :meth:`plan_async`."""
+        if self.quota <= 0:
+            return NORMAL
+        now = self.clock()
+        with self._lock:
+            counters = self._counters_locked(self._period(now))
+        return self._decide(counters, now)
+
+    async def plan_async(self) -> str:
+        """:meth:`plan` in the executor, reusing the last plan for ``plan_ttl`` seconds."""
+        if self.quota <= 0:
+            return NORMAL
+        if self._plan is not None and self.clock() - self._plan_at < self.plan_ttl:
+            return self._plan
+        return await asyncio.get_running_loop().run_in_executor(None, self.plan)
+
+    def report(self) -> dict:
+        """Spend and avoided calls this month (blocking)."""
+        now = self.clock()
+        with self._lock:
+            counters = self._counters_locked(self._period(now))
+        plan = self._decide(counters, now) if self.quota > 0 else NORMAL
+        used = counters.pop("bing", 0)
+        elapsed = self._elapsed(now)
+        projected = round(used / elapsed) if elapsed > 0 else used
+        avoided = {counter[len("avoided_"):]: value for counter, value in counters.items()
+                   if counter.startswith("avoided_")}
+        return {
+            "period": self._period(now),
+            "plan": plan,
+            "used": used,
+            "quota": self.quota,
+            "avoided": avoided,
+            "calls_avoided": sum(avoided.values()),
+            "reserve_used": counters.get("reserve", 0),
+            "spend": round(used * self.price_per_1000 / 1000, 2),
+            "projected_calls": projected,
+            "projected_spend": round(projected * self.price_per_1000 / 1000, 2),
+        }
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from provider_health import CircuitOpen, ProviderHealth
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SearchProvider:
+    """A web lookup ``search(query) -> str | None`` with its own deadline.
+
+    When ``hedge_after`` is set and the first attempt has not answered after
+    that many seconds, another attempt is started and the first to answer wins.
+    With ``health`` set, a provider whose breaker is open is skipped outright.
+    """
+    name: str
+    search: Callable[[str], Awaitable[Optional[str]]]
+    deadline: float = 5.0
+    hedge_after: Optional[float] = None
+    max_hedges: int = 1
+    health: Optional[ProviderHealth] = None
+
+
+class FanOutSearch:
+    """Queries every provider concurrently and returns the most preferred answer.
+
+    Providers are ordered by preference. The result is returned as soon as no
+    more-preferred provider can still answer, and the remaining lookups are
+    cancelled.
+    """
+
+    def __init__(self, providers=()):
+        self.providers = []
+        self.stats = {"searches": 0, "empty": 0, "hedges": 0, "cancelled": 0, "skipped": 0, "wins": {}}
+        for provider in providers:
+            self.register(provider)
+
+    def register(self, provider: SearchProvider) -> None:
+        self.providers.append(provider)
+        self.stats["wins"].setdefault(provider.name, 0)
+
+    async def search(self, query: str) -> Optional[str]:
+        self.stats["searches"] += 1
+        results = {}
+        tasks = {}
+        for provider in self.providers:
+            if provider.health is not None and not provider.health.available:
+                # Breaker terbuka: anggap tidak ada jawaban tanpa menunggu apa pun.
+                results[provider.name] = None
+                self.stats["skipped"] += 1
+            else:
+                tasks[asyncio.create_task(self._call(provider, query))] = provider
+        pending = set(tasks)
+        try:
+            while True:
+                for provider in self.providers:
+                    if provider.name not in results:
+                        break
+                    if results[provider.name]:
+                        self.stats["wins"][provider.name] += 1
+                        return results[provider.name]
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results[tasks[task].name] = task.result()
+            self.stats["empty"] += 1
+            return None
+        finally:
+            self.stats["cancelled"] += len(pending)
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, provider: SearchProvider, query: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + provider.deadline
+        attempts = [asyncio.create_task(provider.search(query))]
+        hedges = 0
+        try:
+            while attempts:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    logger.warning(f"Pencarian {provider.name} melewati batas waktu {provider.deadline}s")
+                    return None
+                can_hedge = provider.hedge_after is not None and hedges < provider.max_hedges
+                timeout = min(remaining, provider.hedge_after) if can_hedge else remaining
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if can_hedge:
+                        hedges += 1
+                        self.stats["hedges"] += 1
+                        attempts.append(asyncio.create_task(provider.search(query)))
+                    continue
+                for task in done:
+                    attempts.remove(task)
+                    if isinstance(task.exception(), CircuitOpen):
+                        logger.debug(f"Pencarian {provider.name} dilewati: {task.exception()}")
+                    elif task.exception() is not None:
+                        logger.error(f"Kesalahan pencarian {provider.name}: {task.exception()}")
+                    elif task.result():
+                        return task.result()
+            return None
+        finally:
+            for task in attempts:
+                task.cancel()
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import zlib
+from telegram import Bot, Update
+from telegram.error import TelegramError
+import webhook
+from webhook import WebhookApp, start_application, stop_application
+
+logger = logging.getLogger(__name__)
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))  # diisi supervisor untuk tiap proses shard
+SHARD_QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", "1000"))
+POLL_TIMEOUT = 30  # detik, long polling getUpdates
+
+# Antrean pasangan (query, response) dari semua shard menuju shard 0, pemilik pelatihan.
+_learned = None
+
+
+def owns_training() -> bool:
+    """True in the process that runs training: shard 0, or the only process when not sharded."""
+    return SHARD_INDEX == 0
+
+
+def shard_count(mode: str = "polling") -> int:
+    """Number of bot processes: ``SHARD_COUNT``, or ``WEBHOOK_WORKERS`` if larger in webhook mode."""
+    if mode == "webhook":
+        return max(SHARD_COUNT, webhook.WEBHOOK_WORKERS)
+    return SHARD_COUNT
+
+
+def shard_for(key: int, shards: int) -> int:
+    """Map a chat id onto one of ``shards`` contiguous ranges of its 32-bit hash."""
+    return (zlib.crc32(str(key).encode()) * shards) >> 32
+
+
+def routing_key(data: dict) -> int:
+    update = Update.de_json(data, None)
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return 0
+
+
+def forward_learned(query: str, response: str) -> None:
+    """Hand a learned pair to shard 0 from any other shard."""
+    if _learned is not None:
+        _learned.put((query, response))
+
+
+def start_learned_listener(callback, loop=None) -> None:
+    """In shard 0, feed pairs forwarded by other shards to ``callback(query, response)`` on the loop."""
+    if _learned is None:
+        return
+    loop = loop or asyncio.get_running_loop()
+
+    def listen():
+        while True:
+            item = _learned.get()
+            if item is None:
+                return
+            try:
+                loop.call_soon_threadsafe(callback, *item)
+            except RuntimeError:
+                return  # event loop sudah ditutup
+
+    threading.Thread(target=listen, daemon=True).start()
+
+
+async def _run_shard(application, inbox) -> None:
+    await start_application(application)
+    loop = asyncio.get_running_loop()
+    finished = asyncio.Event()
+
+    def read():
+        while True:
+            data = inbox.get()
+            if data is None:
+                break
+            while application.update_queue.qsize() >= SHARD_QUEUE_SIZE:
+                time.sleep(0.05)
+            update = Update.de_json(data, application.bot)
+            loop.call_soon_threadsafe(application.update_queue.put_nowait, update)
+        loop.call_soon_threadsafe(finished.set)
+
+    threading.Thread(target=read, daemon=True).start()
+    await finished.wait()
+    await stop_application(application)
+
+
+def _shard_worker(build_application, shard, inbox, learned) -> None:
+    global _learned
+    _learned = learned
+    # Ctrl+C sampai ke semua proses; penghentian shard diatur supervisor lewat inbox.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.info(f"Shard {shard} dimulai (pid {os.getpid()})")
+    asyncio.run(_run_shard(build_application(), inbox))
+
+
+class ShardSupervisor:
+    """Runs ``shards`` bot processes and routes every update to the one that owns its chat.
+
+    Each shard builds its own Application with ``build_application`` and keeps
+    per-chat state to itself. A user's ``user_data`` can be touched from
+    several chats, and so several shards; SQLitePersistence merges it per key.
+    Learned knowledge goes through the shared
+    stores (SQLite knowledge base, training log and model artifacts written
+    by shard 0). A chat always hashes to the same shard, so its updates stay
+    in order.
+    """
+
+    def __init__(self, build_application, shards=SHARD_COUNT):
+        self.build_application = build_application
+        self.shards = shards
+        self.stats = {"routed": [0] * shards}
+        self._processes = []
+        self._inboxes = []
+        self._learned = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._processes)
+
+    def start(self) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        self._learned = ctx.Queue()
+        previous = {name: os.environ.get(name) for name in ("SHARD_INDEX", "SHARD_COUNT")}
+        try:
+            # Modul bot membaca SHARD_INDEX dan SHARD_COUNT saat diimpor ulang di proses anak
+            # (jumlah shard bisa berasal dari WEBHOOK_WORKERS).
+            os.environ["SHARD_COUNT"] = str(self.shards)
+            for shard in range(self.shards):
+                os.environ["SHARD_INDEX"] = str(shard)
+                inbox = ctx.Queue()
+                process = ctx.Process(target=_shard_worker, name=f"shard-{shard}",
+                                      args=(self.build_application, shard, inbox, self._learned))
+                process.start()
+                self._inboxes.append(inbox)
+                self._processes.append(process)
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def route(self, data: dict) -> int:
+        shard = shard_for(routing_key(data), self.shards)
+        self._inboxes[shard].put(data)
+        self.stats["routed"][shard] += 1
+        return shard
+
+    def stop(self, timeout: float = 30) -> None:
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._learned is not None:
+            self._learned.put(None)
+        self._processes = []
+        self._inboxes = []
+        logger.info(f"Statistik shard: {self.stats}")
+
+    async def poll(self, token: str) -> None:
+        """Long-poll getUpdates in this process and route each update to its shard."""
+        offset = None
+        async with Bot(token) as bot:
+            await bot.delete_webhook()
+            while True:
+                try:
+                    updates = await bot.get_updates(offset=offset, timeout=POLL_TIMEOUT)
+                except TelegramError as e:
+                    logger.warning(f"Kesalahan getUpdates: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                for update in updates:
+                    self.route(update.to_dict())
+                    offset = update.update_id + 1
+
+
+class ShardedWebhookApp(WebhookApp):
+    """Webhook front end that routes updates to shard processes instead of a local Application."""
+
+    def __init__(self, supervisor: ShardSupervisor, **kwargs):
+        super().__init__(None, **kwargs)
+        self.supervisor = supervisor
+
+    @property
+    def ready(self) -> bool:
+        return self.supervisor.running
+
+    async def startup(self) -> None:
+        self.supervisor.start()
+
+    async def shutdown(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.supervisor.stop)
+        logger.info(f"Statistik webhook: {self.stats}")
+
+    async def enqueue(self, data: dict) -> bool:
+        self.supervisor.route(data)
+        return True
+
+
+def run(build_application, token: str, shards: int = SHARD_COUNT, mode: str = "polling") -> None:
+    """Entry point for ``shard_count(mode) > 1``: this process becomes the front dispatcher."""
+    supervisor = ShardSupervisor(build_application, shards)
+    if mode == "webhook":
+        webhook.serve(ShardedWebhookApp(supervisor), token)
+        return
+    supervisor.start()
+    try:
+        asyncio.run(supervisor.poll(token))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
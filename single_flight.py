@@ -0,0 +1,49 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight task.
+
+    The first caller for a key (the leader) starts ``func(*args)``; callers
+    that arrive while it runs await the same result instead of starting
+    their own. The key is forgotten as soon as the task finishes, so this
+    is not a cache. A cancelled caller only cancels the shared task when
+    no other caller is still waiting for it.
+    """
+
+    def __init__(self):
+        self.stats = {"calls": 0, "leaders": 0, "coalesced": 0, "max_waiters": 0}
+        self._flights = {}  # key -> [task, jumlah penunggu]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key, func, *args):
+        """Return ``await func(*args)``, shared with concurrent callers of the same ``key``."""
+        self.stats["calls"] += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(func(*args))
+            flight = self._flights[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, flight=flight: self._land(key, flight))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        flight[1] += 1
+        self.stats["max_waiters"] = max(self.stats["max_waiters"], flight[1])
+        try:
+            return await asyncio.shield(flight[0])
+        except asyncio.CancelledError:
+            if flight[1] == 1 and not flight[0].done():
+                flight[0].cancel()
+            raise
+        finally:
+            flight[1] -= 1
+
+    def _land(self, key, flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
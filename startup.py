@@ -0,0 +1,184 @@
+"""Startup bookkeeping: lazy imports, phase timings, parallel loading and readiness.
+
+    python startup.py [app|llm]    # benchmark time-to-first-reply against a fake Bot API
+"""
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+READINESS_FILE = os.getenv("READINESS_FILE")  # mis. /tmp/bot.ready untuk probe kontainer
+STARTUP_WORKERS = 4
+
+STARTED_AT = time.perf_counter()
+timings = OrderedDict()  # fase -> detik
+ready = threading.Event()
+_lock = threading.Lock()
+_last_checkpoint = STARTED_AT
+
+
+def record(name: str, seconds: float) -> None:
+    with _lock:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def checkpoint(name: str) -> None:
+    """Record the time since the previous checkpoint (or process start) under ``name``."""
+    global _last_checkpoint
+    now = time.perf_counter()
+    record(name, now - _last_checkpoint)
+    _last_checkpoint = now
+
+
+@contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Resolved attributes are cached on the proxy, so after the first use a
+    lookup costs the same as on the real module.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(self._name)
+            record(f"impor {self._name}", time.perf_counter() - started)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        state = "dimuat" if self.__dict__["_module"] is not None else "belum dimuat"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def preload(*modules: LazyModule) -> threading.Thread:
+    """Import lazy modules in a background thread so the first real use does not pay for it."""
+    def run():
+        for module in modules:
+            try:
+                module._load()
+            except ImportError as e:
+                logger.warning(f"Gagal memuat modul {module._name}: {e}")
+
+    thread = threading.Thread(target=run, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+async def load_parallel(loaders: dict) -> dict:
+    """Run blocking ``{name: callable}`` loaders concurrently in threads, timing each one."""
+    loop = asyncio.get_running_loop()
+
+    def timed(name, loader):
+        with phase(f"muat {name}"):
+            return loader()
+
+    with ThreadPoolExecutor(max_workers=min(STARTUP_WORKERS, len(loaders) or 1),
+                            thread_name_prefix="startup") as executor:
+        results = await asyncio.gather(*(loop.run_in_executor(executor, timed, name, loader)
+                                         for name, loader in loaders.items()))
+    return dict(zip(loaders, results))
+
+
+def report() -> str:
+    with _lock:
+        parts = [f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()]
+    return ", ".join(parts)
+
+
+def mark_ready() -> None:
+    """Declare the bot ready to answer: log the breakdown and touch READINESS_FILE."""
+    record("total sampai siap", time.perf_counter() - STARTED_AT)
+    ready.set()
+    if READINESS_FILE:
+        with open(READINESS_FILE, "w", encoding='utf-8') as f:
+            f.write(str(os.getpid()))
+    logger.info(f"Bot siap. Rincian startup: {report()}")
+
+
+def clear_ready() -> None:
+    ready.clear()
+    if READINESS_FILE and os.path.exists(READINESS_FILE):
+        os.remove(READINESS_FILE)
+
+
+async def _first_reply(module_name: str, text: str) -> None:
+    from load_test import FakeBotAPI, synthetic_updates
+
+    imported_at = time.perf_counter()
+    bot = importlib.import_module(module_name)
+    record("impor bot", time.perf_counter() - imported_at)
+    update = synthetic_updates(1, 1)[0]
+    update["message"]["text"] = text
+    if text.startswith("/"):
+        update["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    api = FakeBotAPI([update], api_latency=0)
+    application = bot.build_application(request=api)
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await application.updater.start_polling(poll_interval=0)
+        try:
+            await asyncio.wait_for(api.done.wait(), 30)
+            record("balasan pertama", time.perf_counter() - STARTED_AT)
+        except asyncio.TimeoutError:
+            print("tidak ada balasan dalam 30 detik")
+        await application.updater.stop()
+        await application.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+    print(report())
+
+
+if __name__ == "__main__":
+    import subprocess
+    import sys
+
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        # Lewat modul "startup" agar pencatatan waktu sama dengan yang dipakai bot.
+        import startup
+
+        asyncio.run(startup._first_reply(sys.argv[2], sys.argv[3]))
+        sys.exit(0)
+
+    # Tiap pengukuran di proses baru agar impor benar-benar dingin.
+    bots = sys.argv[1:] or ["app", "llm"]
+    for bot in bots:
+        # Jawaban yang tidak butuh jaringan: intent sapaan di app, perintah /help di llm.
+        text = "apa kabar" if bot == "app" else "/help"
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, __file__, "--child", bot, text], capture_output=True, text=True,
+                                env={**os.environ, "TELEGRAM_BOT_TOKEN": os.getenv("TELEGRAM_BOT_TOKEN", "0:bench")})
+        wall = time.perf_counter() - started
+        print(f"{bot}: {wall * 1000:.0f} ms dari exec sampai keluar")
+        print("   ", (output.stdout or output.stderr).strip().splitlines()[-1])
@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SYMPY_WORKERS = int(os.getenv("SYMPY_WORKERS", "2"))
+SYMPY_TIMEOUT = float(os.getenv("SYMPY_TIMEOUT", "5"))  # detik per pekerjaan
+SYMPY_MEMORY_MB = int(os.getenv("SYMPY_MEMORY_MB", "512"))
+SYMPY_CACHE_SIZE = 512
+MAX_EXPRESSION_LENGTH = 200
+
+# Hanya nama-nama ini yang boleh muncul; parse_expr memakai eval, jadi tidak ada
+# garis bawah, titik atribut, atau nama lain yang bisa mencapai builtins.
+ALLOWED_NAMES = {"x", "e", "pi", "sin", "cos", "tan", "cot", "sec", "csc", "asin", "acos", "atan",
+                 "sinh", "cosh", "tanh", "exp", "log", "ln", "sqrt", "abs"}
+_ALLOWED_CHARS = re.compile(r"[0-9a-z+\-*/^().,\s]*")
+_NAME = re.compile(r"[a-z]+")
+_SPACES = re.compile(r"\s+")
+
+
+class SymbolicMathError(ValueError):
+    pass
+
+
+class SymbolicMathTimeout(SymbolicMathError):
+    pass
+
+
+def canonical_text(expression: str) -> str:
+    """Cheap textual normal form, validated against the allowed grammar."""
+    text = _SPACES.sub("", expression.lower()).replace("**", "^")
+    if not text or len(text) > MAX_EXPRESSION_LENGTH or not _ALLOWED_CHARS.fullmatch(text):
+        raise SymbolicMathError("Ekspresi tidak valid")
+    for name in _NAME.findall(text):
+        if name not in ALLOWED_NAMES:
+            raise SymbolicMathError(f"Nama tidak dikenal: {name}")
+    return text
+
+
+def _limit_cpu(resource, seconds: float) -> None:
+    # RLIMIT_CPU bersifat kumulatif per proses, jadi batasnya digeser sebelum tiap pekerjaan.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+
+def _worker(conn, memory_mb, cpu_seconds) -> None:
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        resource = None  # tidak ada batas sumber daya di platform ini
+    import sympy as sp
+    from sympy.parsing.sympy_parser import (parse_expr, standard_transformations, convert_xor,
+                                            implicit_multiplication_application)
+
+    x = sp.Symbol("x")
+    transformations = standard_transformations + (convert_xor, implicit_multiplication_application)
+    names = {"x": x, "e": sp.E, "pi": sp.pi, "ln": sp.log, "abs": sp.Abs}
+    names.update({name: getattr(sp, name) for name in ALLOWED_NAMES if name not in names})
+    sp.integrate(sp.sin(x) * x, x)  # pemanasan cache internal sympy
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            op, text = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if resource is not None:
+            _limit_cpu(resource, cpu_seconds)
+        try:
+            if op == "parse":
+                expr = parse_expr(text, local_dict=names, global_dict={**vars(sp), "__builtins__": {}},
+                                  transformations=transformations)
+                result = (sp.srepr(expr), str(expr))
+            else:
+                expr = sp.sympify(text)
+                result = str(sp.diff(expr, x) if op == "diff" else sp.integrate(expr, x))
+            conn.send(("ok", result))
+        except MemoryError:
+            conn.send(("error", "Memori tidak cukup"))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_mb, cpu_seconds):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(child, memory_mb, cpu_seconds), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    async def recv(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: future.done() or future.set_result(None))
+        try:
+            await future
+        finally:
+            loop.remove_reader(fd)
+        return self.conn.recv()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class SymbolicMath:
+    """Derivatives and integrals in a pool of pre-warmed SymPy processes.
+
+    Each job runs in a worker with an address-space limit, a CPU-time limit
+    and a wall clock ``timeout``. A worker that overruns, or whose caller is cancelled,
+    is killed and replaced, so a runaway integral never touches the event
+    loop. Results are cached by the canonical SymPy form of the expression:
+    ``x^2`` and ``x**2`` share an entry.
+    """
+
+    def __init__(self, workers=SYMPY_WORKERS, timeout=SYMPY_TIMEOUT, memory_mb=SYMPY_MEMORY_MB,
+                 cache_size=SYMPY_CACHE_SIZE):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.cache_size = cache_size
+        self.stats = {"jobs": 0, "cache_hits": 0, "timeouts": 0, "errors": 0, "restarts": 0}
+        self._cache = OrderedDict()
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = None
+        self._all = []
+
+    def start(self) -> None:
+        """Spawn the workers; they import SymPy in the background."""
+        self._idle = asyncio.Queue()
+        for _ in range(self.workers):
+            self._add_worker()
+
+    def _add_worker(self) -> None:
+        worker = _Worker(self._ctx, self.memory_mb, self.timeout)
+        self._all.append(worker)
+        self._idle.put_nowait(worker)
+
+    async def stop(self) -> None:
+        for worker in self._all:
+            worker.kill()
+        self._all = []
+        self._idle = None
+
+    async def _call(self, op: str, text: str):
+        if self._idle is None:
+            raise SymbolicMathError("Layanan matematika simbolik belum berjalan")
+        worker = await self._idle.get()
+        healthy = False
+        try:
+            if not worker.ready:
+                # Pekerja baru masih mengimpor sympy; itu tidak dihitung ke batas waktu pekerjaan.
+                await worker.recv()
+                worker.ready = True
+            worker.conn.send((op, text))
+            status, result = await asyncio.wait_for(worker.recv(), self.timeout)
+            healthy = True
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise SymbolicMathTimeout(f"Perhitungan melebihi {self.timeout:.0f} detik") from None
+        except (EOFError, OSError) as e:
+            self.stats["errors"] += 1
+            raise SymbolicMathError(f"Pekerja sympy berhenti: {e}") from None
+        finally:
+            if healthy:
+                self._idle.put_nowait(worker)
+            else:
+                # Timeout, pembatalan atau proses mati: ganti dengan pekerja baru.
+                worker.kill()
+                self._all.remove(worker)
+                self.stats["restarts"] += 1
+                if self._idle is not None:
+                    self._add_worker()
+        if status != "ok":
+            self.stats["errors"] += 1
+            raise SymbolicMathError(result)
+        return result
+
+    def _cached(self, key):
+        value = self._cache.get(key)
+        if value is not None:
+            self._cache.move_to_end(key)
+        return value
+
+    def _remember(self, key, value) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _run(self, op: str, expression: str) -> tuple:
+        self.stats["jobs"] += 1
+        text_key = (op, canonical_text(expression))
+        hit = self._cached(text_key)
+        if hit is None:
+            canonical, shown = await self._call("parse", text_key[1])
+            hit = self._cached((op, canonical))
+            if hit is None:
+                hit = (shown, await self._call(op, canonical))
+                self._remember((op, canonical), hit)
+            self._remember(text_key, hit)
+        else:
+            self.stats["cache_hits"] += 1
+        return hit
+
+    async def derivative(self, expression: str) -> tuple:
+        """Return ``(expression, d/dx expression)`` as strings."""
+        return await self._run("diff", expression)
+
+    async def integral(self, expression: str) -> tuple:
+        """Return ``(expression, indefinite integral over x)`` as strings."""
+        return await self._run("integrate", expression)
@@ -0,0 +1,79 @@
+import asyncio
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+import http_client
+from chat_scheduler import ChatScheduler
+from load_test import FakeBotAPI, run, synthetic_updates
+
+
+async def _serve(api, handler, scheduler, error_handler=None):
+    application = ApplicationBuilder().token("0:test").request(api).get_updates_request(api).build()
+    application.add_handler(MessageHandler(filters.TEXT, scheduler.wrap(handler)))
+    if error_handler is not None:
+        application.add_error_handler(error_handler)
+    async with application:
+        await application.start()
+        await application.updater.start_polling(poll_interval=0)
+        await asyncio.wait_for(api.done.wait(), 30)
+        await application.updater.stop()
+        await scheduler.stop()
+        await application.stop()
+
+
+def test_handler_errors_reach_application_error_handlers():
+    updates = synthetic_updates(chats=2, messages=2)
+    api = FakeBotAPI(updates, api_latency=0)
+    scheduler = ChatScheduler()
+    errors = []
+
+    async def handle(update, context):
+        if update.message.text.endswith(":0"):
+            raise ValueError(update.message.text)
+        await update.message.reply_text(update.message.text)
+
+    async def on_error(update, context):
+        errors.append((update.update_id, context.error))
+        if len(errors) == 2:
+            api.done.set()
+
+    asyncio.run(_serve(api, handle, scheduler, on_error))
+    assert sorted(update_id for update_id, _ in errors) == sorted(
+        update["update_id"] for update in updates if update["message"]["text"].endswith(":0"))
+    assert all(isinstance(error, ValueError) for _, error in errors)
+    assert scheduler.stats["failed"] == 2
+
+
+def test_replies_keep_per_chat_order_under_concurrency():
+    updates = synthetic_updates(chats=30, messages=5)
+    scheduler = ChatScheduler(max_concurrent=16)
+    result = asyncio.run(run(updates, latency=0.02, scheduler=scheduler, api_latency=0.005, timeout=30))
+    assert result["updates"] == len(updates)
+    assert result["chats_out_of_order"] == 0
+    assert 1 < scheduler.stats["max_active"] <= 16
+    assert scheduler.stats["completed"] == len(updates) and scheduler.pending == 0
+
+
+def test_pending_limit_holds_back_submissions():
+    async def scenario():
+        scheduler = ChatScheduler(max_concurrent=2, max_pending=4)
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+
+        for chat_id in range(4):
+            await scheduler.submit(chat_id, job)
+        blocked = asyncio.create_task(scheduler.submit(99, job))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        release.set()
+        await asyncio.wait_for(blocked, 1)
+        await scheduler.stop()
+        return scheduler.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["backpressure_waits"] == 1 and stats["max_pending"] == 4 and stats["completed"] == 5
+
+
+def test_http_saturation_holds_back_submissions():
+    # Pemeriksaan dengan server lokal lambat; gagal bila sinyal tekanan HTTP tidak pernah aktif.
+    asyncio.run(http_client._check_backpressure())
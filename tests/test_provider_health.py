@@ -0,0 +1,181 @@
+import asyncio
+import pytest
+import http_client
+from provider_health import CLOSED, HALF_OPEN, OPEN, CircuitOpen, ProviderHealth, _stub_server
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def ok(timeout=None):
+    return "ok"
+
+
+async def fail(timeout=None):
+    raise ConnectionError("upstream down")
+
+
+def _open_breaker(health):
+    for _ in range(health.failure_threshold):
+        with pytest.raises(ConnectionError):
+            asyncio.run(health.call(fail))
+    assert health.state == OPEN
+
+
+def test_opens_after_threshold_and_fails_fast():
+    health = ProviderHealth("stub", failure_threshold=3, reset_timeout=10, clock=Clock())
+    _open_breaker(health)
+    with pytest.raises(CircuitOpen):
+        asyncio.run(health.call(ok))
+    assert health.stats["opened"] == 1 and health.stats["fast_fails"] == 1
+    assert not health.available
+
+
+def test_half_open_probe_closes_or_reopens():
+    clock = Clock()
+    health = ProviderHealth("stub", failure_threshold=2, reset_timeout=10, clock=clock)
+    _open_breaker(health)
+    clock.now = 10
+    assert health.available
+    with pytest.raises(ConnectionError):
+        asyncio.run(health.call(fail))
+    assert health.state == OPEN and health.stats["opened"] == 2
+    clock.now = 20
+    assert asyncio.run(health.call(ok)) == "ok"
+    assert health.state == CLOSED and health.stats["probes"] == 2
+
+
+def test_only_one_probe_at_a_time():
+    async def scenario():
+        clock = Clock()
+        health = ProviderHealth("stub", failure_threshold=1, reset_timeout=10, clock=clock)
+        with pytest.raises(ConnectionError):
+            await health.call(fail)
+        clock.now = 10
+        release = asyncio.Event()
+
+        async def slow(timeout=None):
+            await release.wait()
+            return "ok"
+
+        probe = asyncio.create_task(health.call(slow))
+        await asyncio.sleep(0)
+        assert health.state == HALF_OPEN
+        with pytest.raises(CircuitOpen):
+            await health.call(ok)
+        release.set()
+        assert await probe == "ok"
+        return health
+
+    health = asyncio.run(scenario())
+    assert health.state == CLOSED and health.stats["probes"] == 1
+
+
+def test_late_call_does_not_release_the_probe():
+    # Regresi: panggilan yang dimulai sebelum breaker terbuka tidak boleh melepas probe half-open.
+    async def scenario():
+        clock = Clock()
+        health = ProviderHealth("stub", failure_threshold=1, reset_timeout=10, clock=clock)
+        release_late = asyncio.Event()
+        release_probe = asyncio.Event()
+
+        async def late(timeout=None):
+            await release_late.wait()
+            return "late"
+
+        async def probe(timeout=None):
+            await release_probe.wait()
+            return "probe"
+
+        late_call = asyncio.create_task(health.call(late))
+        await asyncio.sleep(0)
+        with pytest.raises(ConnectionError):
+            await health.call(fail)
+        clock.now = 10
+        probe_call = asyncio.create_task(health.call(probe))
+        await asyncio.sleep(0)
+        release_late.set()
+        assert await late_call == "late"
+        # Probe masih berjalan: panggilan lain tetap ditolak dan breaker belum tertutup.
+        assert health.state == HALF_OPEN and not health.available
+        with pytest.raises(CircuitOpen):
+            await health.call(ok)
+        release_probe.set()
+        assert await probe_call == "probe"
+        return health
+
+    health = asyncio.run(scenario())
+    assert health.state == CLOSED and health.stats["probes"] == 1
+
+
+def test_stale_success_does_not_close_an_open_breaker():
+    async def scenario():
+        health = ProviderHealth("stub", failure_threshold=1, reset_timeout=10, clock=Clock())
+        release = asyncio.Event()
+
+        async def slow(timeout=None):
+            await release.wait()
+            return "ok"
+
+        slow_call = asyncio.create_task(health.call(slow))
+        await asyncio.sleep(0)
+        with pytest.raises(ConnectionError):
+            await health.call(fail)
+        release.set()
+        await slow_call
+        return health
+
+    health = asyncio.run(scenario())
+    assert health.state == OPEN and health.stats["successes"] == 1
+
+
+def test_disabled_provider_always_fails_fast():
+    health = ProviderHealth("bing")
+    health.disable("BING_API_KEY tidak diisi")
+    with pytest.raises(CircuitOpen):
+        asyncio.run(health.call(ok))
+    assert health.stats["calls"] == 0 and not health.available
+
+
+def test_stub_server_timeouts_errors_and_recovery():
+    async def scenario():
+        mode = {"delay": 0.01, "status": 200}
+        server = await _stub_server(mode)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+        health = ProviderHealth("stub", failure_threshold=3, reset_timeout=0.3, min_timeout=0.1, max_timeout=2)
+        try:
+            for _ in range(25):
+                await health.call(http_client.fetch_json, url)
+            # p95 dari latensi lokal yang kecil: timeout turun ke batas bawah.
+            assert health.timeout() == pytest.approx(0.1)
+
+            mode.update(status=503)
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    await health.call(http_client.fetch_json, url)
+            assert health.state == OPEN
+            with pytest.raises(CircuitOpen):
+                await health.call(http_client.fetch_json, url)
+
+            mode.update(status=200, delay=1)
+            await asyncio.sleep(0.35)
+            with pytest.raises(asyncio.TimeoutError):
+                await health.call(http_client.fetch_json, url)
+            assert health.state == OPEN and health.stats["timeouts"] == 1
+
+            mode.update(delay=0.01)
+            await asyncio.sleep(0.35)
+            await health.call(http_client.fetch_json, url)
+            assert health.state == CLOSED
+        finally:
+            server.close()
+            await http_client.close_client()
+        return health
+
+    health = asyncio.run(scenario())
+    assert health.stats["opened"] == 2 and health.stats["probes"] == 2
@@ -0,0 +1,77 @@
+import asyncio
+import time
+import pytest
+from telegram.error import RetryAfter
+from chat_scheduler import ChatScheduler
+from load_test import run, synthetic_updates
+from rate_limiter import TelegramRateLimiter, TokenBucket
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2, capacity=1, now=0.0)
+    assert bucket.take(0.0)
+    assert not bucket.take(0.1)
+    assert bucket.delay(0.1) == pytest.approx(0.4)
+    assert bucket.take(0.5)
+    bucket.block(until=3.0)
+    assert bucket.delay(1.0) == pytest.approx(2.0)
+
+
+async def _send(limiter, chat_id, callback):
+    return await limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": chat_id}, None)
+
+
+def test_retry_after_pauses_only_that_chat_and_retries():
+    async def scenario():
+        limiter = TelegramRateLimiter(chat_burst=5)
+        await limiter.initialize()
+        sent = []
+
+        def sender(chat_id, fail_first=False):
+            failures = [fail_first]
+
+            async def callback():
+                if failures.pop() if failures else False:
+                    raise RetryAfter(1)
+                sent.append((chat_id, time.perf_counter()))
+                return True
+            return callback
+
+        started = time.perf_counter()
+        results = await asyncio.gather(_send(limiter, 1, sender(1, fail_first=True)), _send(limiter, 2, sender(2)))
+        await limiter.shutdown()
+        return limiter.stats, results, {chat_id: at - started for chat_id, at in sent}
+
+    stats, results, sent_after = asyncio.run(scenario())
+    assert results == [True, True]
+    assert stats["retry_after"] == 1 and stats["retries"] == 1 and stats["gave_up"] == 0
+    assert sent_after[1] >= 0.95  # menunggu retry_after
+    assert sent_after[2] < 0.5  # chat lain tidak ikut tertahan
+
+
+def test_retry_after_gives_up_after_max_retries():
+    async def scenario():
+        limiter = TelegramRateLimiter(max_retries=1)
+        await limiter.initialize()
+
+        async def callback():
+            raise RetryAfter(0)
+
+        with pytest.raises(RetryAfter):
+            await _send(limiter, 1, callback)
+        await limiter.shutdown()
+        return limiter.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["retry_after"] == 2 and stats["retries"] == 1 and stats["gave_up"] == 1
+
+
+def test_no_flood_errors_against_telegram_limits():
+    updates = synthetic_updates(chats=20, messages=3)
+    limiter = TelegramRateLimiter()
+    scheduler = ChatScheduler(pressure=[limiter.saturated])
+    result = asyncio.run(run(updates, latency=0.01, scheduler=scheduler, flood_limits=True,
+                             rate_limiter=limiter, timeout=30))
+    assert result["updates"] == len(updates)
+    assert result["flood_errors"] == 0 and result["lost"] == 0
+    assert result["chats_out_of_order"] == 0
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from provider_health import ProviderHealth
+from search_engine import FanOutSearch, SearchProvider
+
+
+def _provider(name, answer, delay=0.0, calls=None, **kwargs):
+    async def search(query):
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        return answer
+    return SearchProvider(name, search, **kwargs)
+
+
+def _search(fan_out, query="apa itu python"):
+    return asyncio.run(fan_out.search(query))
+
+
+def test_preferred_provider_wins_even_when_slower():
+    fan_out = FanOutSearch([_provider("bing", "B", delay=0.05), _provider("wikipedia", "W")])
+    assert _search(fan_out) == "B"
+    assert fan_out.stats["wins"] == {"bing": 1, "wikipedia": 0}
+
+
+def test_falls_back_when_preferred_provider_has_no_answer():
+    fan_out = FanOutSearch([_provider("bing", None), _provider("wikipedia", "W", delay=0.02)])
+    assert _search(fan_out) == "W"
+
+
+def test_returns_without_waiting_for_less_preferred_providers():
+    fan_out = FanOutSearch([_provider("bing", "B"), _provider("wikipedia", "W", delay=5)])
+    started = time.perf_counter()
+    assert _search(fan_out) == "B"
+    assert time.perf_counter() - started < 1
+    assert fan_out.stats["cancelled"] == 1
+
+
+def test_skips_provider_whose_breaker_is_open():
+    health = ProviderHealth("bing")
+    health.disable("tanpa API key")
+    calls = []
+    fan_out = FanOutSearch([_provider("bing", "B", calls=calls, health=health), _provider("wikipedia", "W")])
+    assert _search(fan_out) == "W"
+    assert calls == [] and fan_out.stats["skipped"] == 1
+
+
+def test_slow_attempt_is_hedged():
+    attempts = []
+
+    async def search(query):
+        attempts.append(query)
+        await asyncio.sleep(5 if len(attempts) == 1 else 0.01)
+        return "W"
+
+    fan_out = FanOutSearch([SearchProvider("wikipedia", search, deadline=2, hedge_after=0.05)])
+    started = time.perf_counter()
+    assert _search(fan_out) == "W"
+    assert time.perf_counter() - started < 1
+    assert len(attempts) == 2 and fan_out.stats["hedges"] == 1
+
+
+def test_deadline_gives_up_on_a_provider():
+    fan_out = FanOutSearch([_provider("bing", "B", delay=5, deadline=0.1)])
+    started = time.perf_counter()
+    assert _search(fan_out) is None
+    assert time.perf_counter() - started < 1
+    assert fan_out.stats["empty"] == 1
@@ -0,0 +1,97 @@
+"""The trainer grows fitted sklearn estimators and restores them from artifacts
+through private attributes; these checks pin that behaviour to the
+scikit-learn version in requirements.txt.
+"""
+import numpy as np
+import model_artifacts
+import trainer
+from model_artifacts import naive_bayes
+
+FIRST = [("apa kabar", "baik"), ("siapa kamu", "bot"), ("apa kabar hari ini", "baik")]
+SECOND = [("cuaca hari ini", "cerah"), ("siapa presiden", "jokowi"), ("apa kabar", "baik")]
+QUERIES = ["apa kabar", "siapa kamu", "cuaca hari ini", "siapa presiden", "kata baru"]
+
+
+def _by_label(model, proba):
+    return {label: proba[:, i] for i, label in enumerate(model.classes_)}
+
+
+def test_grown_naive_bayes_matches_fresh_fit():
+    vectorizer = trainer.build_vectorizer()
+    models = trainer.build_models()
+    trainer.partial_fit_models(models, vectorizer, FIRST)
+    trainer.partial_fit_models(models, vectorizer, SECOND)
+    grown = models["naive_bayes"]
+
+    pairs = FIRST + SECOND
+    y = np.asarray([response for _, response in pairs], dtype=object)
+    fresh = naive_bayes.MultinomialNB(alpha=0.01)
+    fresh.partial_fit(vectorizer.transform([query for query, _ in pairs]), y, classes=np.unique(y))
+
+    assert set(grown.classes_) == set(fresh.classes_)
+    X = vectorizer.transform(QUERIES)
+    grown_proba = _by_label(grown, grown.predict_proba(X))
+    fresh_proba = _by_label(fresh, fresh.predict_proba(X))
+    for label, column in fresh_proba.items():
+        np.testing.assert_allclose(grown_proba[label], column, rtol=1e-10)
+
+
+def test_growing_binary_sgd_keeps_its_decisions():
+    vectorizer = trainer.build_vectorizer()
+    models = trainer.build_models()
+    trainer.partial_fit_models(models, vectorizer, FIRST)
+    sgd = models["logistic_regression"]
+    X = vectorizer.transform(QUERIES)
+    before = sgd.predict(X)
+
+    trainer._grow_classes(sgd, ["cerah"])
+    assert list(sgd.classes_) == ["baik", "bot", "cerah"]
+    assert sgd.coef_.shape == (3, trainer.HASH_FEATURES)
+    np.testing.assert_array_equal(sgd.predict(X), before)
+
+    sgd.partial_fit(vectorizer.transform(["cuaca hari ini"]), np.asarray(["cerah"], dtype=object))
+    proba = sgd.predict_proba(X)
+    assert proba.shape == (len(QUERIES), 3)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+
+def test_training_state_round_trips_through_artifacts(tmp_path):
+    vectorizer = trainer.build_vectorizer()
+    models = trainer.build_models()
+    trainer.partial_fit_models(models, vectorizer, FIRST + SECOND)
+    model_artifacts.publish(models, vectorizer, str(tmp_path))
+
+    X = vectorizer.transform(QUERIES)
+    scores = model_artifacts.load(str(tmp_path)).models["naive_bayes"].scores(X)
+    scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+    np.testing.assert_allclose(scores / scores.sum(axis=1, keepdims=True),
+                               models["naive_bayes"].predict_proba(X), rtol=1e-4)
+
+    restored = model_artifacts.load_training_state(trainer.build_models(), str(tmp_path))
+    for name, model in models.items():
+        assert list(restored[name].classes_) == list(model.classes_)
+        np.testing.assert_allclose(restored[name].predict_proba(X), model.predict_proba(X), rtol=1e-6)
+
+    # Melanjutkan pelatihan harus sama dengan estimator yang tidak pernah disimpan.
+    more = [("siapa kamu", "bot"), ("cuaca besok", "hujan")]
+    trainer.partial_fit_models(models, vectorizer, more)
+    trainer.partial_fit_models(restored, vectorizer, more)
+    np.testing.assert_allclose(restored["naive_bayes"].predict_proba(X), models["naive_bayes"].predict_proba(X),
+                               rtol=1e-10)
+
+
+def test_single_class_batches_wait_for_sgd():
+    vectorizer = trainer.build_vectorizer()
+    models = trainer.build_models()
+    held = {}
+    trainer.partial_fit_models(models, vectorizer, FIRST[:1], held)
+    trainer.partial_fit_models(models, vectorizer, FIRST[2:], held)
+    assert not hasattr(models["logistic_regression"], "classes_")
+    assert held == {"logistic_regression": [FIRST[0], FIRST[2]]}
+
+    trainer.partial_fit_models(models, vectorizer, FIRST[1:2], held)
+    sgd = models["logistic_regression"]
+    assert held == {}
+    assert list(sgd.classes_) == ["baik", "bot"]
+    # Semua contoh ikut dilatih, termasuk yang tertahan.
+    assert sgd.t_ == 1 + len(FIRST)
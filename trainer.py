@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import numpy as np
+from itertools import islice
+import model_artifacts
+from model_artifacts import linear_model, naive_bayes, sklearn_text
+from training_log import iter_pairs
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAMES = ['naive_bayes', 'logistic_regression']
+HASH_FEATURES = 2 ** 14
+TRAINING_BATCH_SIZE = 16
+TRAINING_FLUSH_INTERVAL = 30  # detik
+
+_FLUSH = "flush"
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def build_vectorizer():
+    """Stateless vectorizer, so new vocabulary never forces a refit."""
+    return sklearn_text.HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False, norm='l2')
+
+
+def build_models():
+    return {
+        'naive_bayes': naive_bayes.MultinomialNB(alpha=0.01),
+        'logistic_regression': linear_model.SGDClassifier(loss='log_loss'),
+    }
+
+
+def _grow_classes(model, new_labels):
+    """Append unseen labels to an already fitted incremental estimator.
+
+    This edits sklearn's fitted attributes directly; tests/test_trainer.py
+    checks it against the scikit-learn version pinned in requirements.txt.
+    """
+    k = len(new_labels)
+    if hasattr(model, "feature_count_"):
+        model.feature_count_ = np.vstack([model.feature_count_, np.zeros((k, model.feature_count_.shape[1]))])
+        model.class_count_ = np.concatenate([model.class_count_, np.zeros(k)])
+    else:
+        coef, intercept = model.coef_, model.intercept_
+        if len(model.classes_) == 2:
+            # Binary SGD keeps a single row for classes_[1]; expand to one-vs-rest.
+            coef = np.vstack([-coef, coef])
+            intercept = np.concatenate([-intercept, intercept])
+        model.coef_ = np.vstack([coef, np.zeros((k, coef.shape[1]))])
+        model.intercept_ = np.concatenate([intercept, np.zeros(k)])
+    model.classes_ = np.concatenate([model.classes_, np.asarray(new_labels, dtype=object)])
+
+
+def partial_fit_models(models, vectorizer, pairs, held=None):
+    """Update every model in place with a batch of (query, response) pairs.
+
+    SGD cannot start from a single class, so until it has seen two its pairs
+    wait in ``held`` (model name -> pairs) and are fed with the next batch.
+    """
+    held = {} if held is None else held
+    X = vectorizer.transform([query for query, _ in pairs])
+    y = np.asarray([response for _, response in pairs], dtype=object)
+    known = np.asarray([], dtype=object)
+
+    for model_name in MODEL_NAMES:
+        model = models.get(model_name)
+        if model is None:
+            continue
+        if not hasattr(model, "classes_"):
+            waiting = held.pop(model_name, []) + list(pairs)
+            batch_X, batch_y = X, y
+            if len(waiting) > len(pairs):
+                batch_X = vectorizer.transform([query for query, _ in waiting])
+                batch_y = np.asarray([response for _, response in waiting], dtype=object)
+            classes = np.unique(np.concatenate([known, batch_y]))
+            if len(classes) < 2 and isinstance(model, linear_model.SGDClassifier):
+                held[model_name] = waiting
+                continue
+            model.partial_fit(batch_X, batch_y, classes=classes)
+        else:
+            seen = set(model.classes_)
+            new_labels = [label for label in dict.fromkeys(y) if label not in seen]
+            if new_labels:
+                _grow_classes(model, new_labels)
+            model.partial_fit(X, y)
+        known = model.classes_
+
+
+def _replay(models, vectorizer, path, held) -> None:
+    pairs = iter_pairs(path) if path else iter(())
+    while chunk := list(islice(pairs, 256)):
+        partial_fit_models(models, vectorizer, chunk, held)
+
+
+def _training_worker(inbox, outbox, bootstrap_path, model_root, batch_size, flush_interval, log_level):
+    # Proses spawn tidak mewarisi konfigurasi logging dari induknya.
+    logging.basicConfig(format=LOG_FORMAT, level=log_level)
+    try:
+        _train_loop(inbox, outbox, bootstrap_path, model_root, batch_size, flush_interval)
+    except Exception:
+        logger.exception("Proses pelatihan berhenti karena kesalahan")
+        raise
+
+
+def _train_loop(inbox, outbox, bootstrap_path, model_root, batch_size, flush_interval):
+    vectorizer = build_vectorizer()
+    models = model_artifacts.load_training_state(build_models(), model_root)
+    batch = []
+    held = {}
+
+    def publish():
+        nonlocal batch
+        started = time.perf_counter()
+        partial_fit_models(models, vectorizer, batch, held)
+        version = model_artifacts.publish(models, vectorizer, model_root)
+        outbox.put(version)
+        logger.info(f"Model versi {version} diterbitkan ({len(batch)} contoh, {time.perf_counter() - started:.3f}s)")
+        batch = []
+
+    if models is None:
+        models = build_models()
+        _replay(models, vectorizer, bootstrap_path, held)
+        outbox.put(model_artifacts.publish(models, vectorizer, model_root))
+    else:
+        # Model yang belum pernah terlatih (SGD dengan satu kelas) tidak ikut tersimpan: ulangi dari log.
+        unfitted = {name: model for name, model in models.items() if not hasattr(model, "classes_")}
+        _replay(unfitted, vectorizer, bootstrap_path, held)
+        if any(hasattr(model, "classes_") for model in unfitted.values()):
+            outbox.put(model_artifacts.publish(models, vectorizer, model_root))
+        else:
+            outbox.put(model_artifacts.current_version(model_root))
+
+    deadline = None
+    while True:
+        timeout = max(0.0, deadline - time.monotonic()) if batch else None
+        try:
+            item = inbox.get(timeout=timeout)
+        except queue.Empty:
+            item = _FLUSH
+
+        if item is None:
+            if batch:
+                publish()
+            break
+        if item == _FLUSH:
+            if batch:
+                publish()
+            continue
+
+        if not batch:
+            deadline = time.monotonic() + flush_interval
+        batch.append(item)
+        if len(batch) >= batch_size:
+            publish()
+
+
+class BackgroundTrainer:
+    """Batches learned pairs and trains them in a separate process.
+
+    Each version is written under ``model_root`` by :mod:`model_artifacts` and
+    only its number crosses the process boundary: ``on_publish(version)`` runs
+    on the event loop that called :meth:`start` and maps the new files, so
+    swapping the references the handlers read never waits on training.
+    """
+
+    def __init__(self, on_publish, model_root=model_artifacts.MODEL_ROOT, batch_size=TRAINING_BATCH_SIZE,
+                 flush_interval=TRAINING_FLUSH_INTERVAL):
+        self.on_publish = on_publish
+        self.model_root = model_root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.version = 0
+        self._process = None
+        self._listener = None
+        self._inbox = None
+        self._outbox = None
+        self._loop = None
+
+    def start(self, bootstrap_path=None, loop=None):
+        """Spawn the worker; with no published models it first trains on the log at ``bootstrap_path``."""
+        self._loop = loop or asyncio.get_running_loop()
+        ctx = multiprocessing.get_context("spawn")
+        self._inbox = ctx.Queue()
+        self._outbox = ctx.Queue()
+        self._process = ctx.Process(
+            target=_training_worker,
+            args=(self._inbox, self._outbox, bootstrap_path, self.model_root, self.batch_size, self.flush_interval,
+                  logging.getLogger().getEffectiveLevel()),
+            daemon=True,
+        )
+        self._process.start()
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            version = self._outbox.get()
+            if version is None:
+                return
+            try:
+                self._loop.call_soon_threadsafe(self._publish, version)
+            except RuntimeError:
+                return  # event loop sudah ditutup
+
+    def _publish(self, version):
+        self.version = version
+        self.on_publish(version)
+
+    def submit(self, query: str, response: str) -> None:
+        if self._inbox is not None:
+            self._inbox.put((query, response))
+
+    def flush(self) -> None:
+        if self._inbox is not None:
+            self._inbox.put(_FLUSH)
+
+    def stop(self, timeout: float = 10) -> None:
+        if self._process is None:
+            return
+        self._inbox.put(None)
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._outbox.put(None)
+        self._listener.join(timeout)
+        self._process = None
+        self._inbox = None
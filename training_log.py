@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FSYNC_BATCH = 32
+FSYNC_INTERVAL = 5.0  # detik
+
+
+def iter_pairs(path: str):
+    """Stream ``(query, response)`` pairs from a JSONL training log.
+
+    A torn last line (crash mid-append) is skipped instead of failing the load.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                yield record["query"], record["response"]
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"Baris log pelatihan {path}:{line_number} rusak, dilewati")
+
+
+def _encode(query: str, response: str) -> str:
+    return json.dumps({"query": query, "response": response}, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class TrainingLog:
+    """Append-only, line-delimited store of learned (query, response) pairs.
+
+    Appends are buffered and fsynced every ``fsync_batch`` records or
+    ``fsync_interval`` seconds. ``compact`` rewrites the log keeping only the
+    latest response per query; it holds the lock only while copying records
+    appended during the rewrite, so it can run in a worker thread.
+    :meth:`topics` keeps the distinct queries in memory and only reads what
+    was appended since its previous call, by this process or another one.
+    The file is opened for appending on the first write, so processes that
+    only read the log hold no handle on it.
+    """
+
+    def __init__(self, path: str, fsync_batch=FSYNC_BATCH, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._topics_lock = threading.Lock()
+        self._topics = {}  # query -> None, urutan kemunculan pertama
+        self._topics_file = None  # (st_dev, st_ino) log yang sudah dibaca
+        self._topics_offset = 0
+
+    def migrate_from_json(self, legacy_path: str) -> int:
+        """One-shot import of the old ``training_data.json`` list into an empty log.
+
+        The records are written to a temporary file that replaces the log in
+        one rename, so a crash mid-import leaves the log empty and the import
+        is retried on the next start. The JSON file may be tracked in git, so
+        it is left alone; a ``{path}.migrated`` marker records the import.
+        """
+        marker = f"{self.path}.migrated"
+        if not os.path.exists(legacy_path) or os.path.exists(marker) or self._size() > 0:
+            return 0
+        with open(legacy_path, "r", encoding='utf-8') as f:
+            records = json.load(f)
+        tmp_path = f"{self.path}.migrate"
+        with open(tmp_path, "w", encoding='utf-8') as out:
+            for record in records:
+                out.write(_encode(record["query"], record["response"]))
+            out.flush()
+            os.fsync(out.fileno())
+        with self._lock:
+            if self._size() > 0:
+                os.remove(tmp_path)  # sudah ada yang menulis ke log; jangan ditimpa
+                return 0
+            os.replace(tmp_path, self.path)
+            self._reopen_locked()
+        with open(marker, "w", encoding='utf-8') as f:
+            f.write(f"{legacy_path}\n")
+        logger.info(f"{len(records)} data pelatihan dipindahkan dari {legacy_path} ke {self.path}")
+        return len(records)
+
+    def _size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def _reopen_locked(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = open(self.path, "a", encoding='utf-8')
+
+    def append(self, query: str, response: str) -> None:
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding='utf-8')
+            self._file.write(_encode(query, response))
+            self._pending += 1
+            if self._pending >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync_locked()
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __iter__(self):
+        self.sync()
+        return iter_pairs(self.path)
+
+    def topics(self) -> list:
+        """Distinct learned queries in first-seen order (blocking on the first call)."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        if not os.path.exists(self.path):
+            return list(self._topics)
+        with self._topics_lock, open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_dev, stat.st_ino) != self._topics_file or stat.st_size < self._topics_offset:
+                # Log baru atau hasil compact: pemadatan tidak membuang query, cukup baca ulang dari awal.
+                self._topics_file = (stat.st_dev, stat.st_ino)
+                self._topics_offset = 0
+            f.seek(self._topics_offset)
+            data = f.read()
+            complete = data.rfind(b"\n") + 1  # baris terakhir yang belum lengkap dibaca lain kali
+            for line in data[:complete].splitlines():
+                try:
+                    self._topics.setdefault(json.loads(line)["query"], None)
+                except (ValueError, KeyError, TypeError):
+                    continue
+            self._topics_offset += complete
+            return list(self._topics)
+
+    def compact(self) -> tuple:
+        """Deduplicate repeated queries; returns ``(records_before, records_after)``."""
+        with self._lock:
+            self._sync_locked()
+            snapshot_size = self._size()
+        if snapshot_size == 0:
+            return 0, 0
+
+        latest = {}
+        before = 0
+        consumed = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                consumed += len(line)
+                if consumed > snapshot_size:
+                    break
+                try:
+                    record = json.loads(line)
+                    query, response = record["query"], record["response"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                before += 1
+                latest.pop(query, None)
+                latest[query] = response
+
+        tmp_path = f"{self.path}.compact"
+        with open(tmp_path, "w", encoding='utf-8') as out:
+            for query, response in latest.items():
+                out.write(_encode(query, response))
+
+            with self._lock:
+                self._sync_locked()
+                with open(self.path, "rb") as f:
+                    f.seek(snapshot_size)
+                    tail = f.read().decode("utf-8")
+                out.write(tail)
+                out.flush()
+                os.fsync(out.fileno())
+                os.replace(tmp_path, self.path)
+                self._reopen_locked()
+
+        appended = tail.count("\n")
+        logger.info(f"Log pelatihan dipadatkan: {before} -> {len(latest)} entri (+{appended} baru)")
+        return before, len(latest) + appended
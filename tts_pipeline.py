@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+TTS_QUEUE_SIZE = int(os.getenv("TTS_QUEUE_SIZE", "64"))
+
+
+class TTSPipeline:
+    """Sends voice replies in the background so text replies never wait on TTS.
+
+    Jobs go into a bounded queue drained by ``workers`` consumers; synthesis
+    runs in a dedicated thread pool of the same size. When the queue is full
+    the voice reply is dropped (the text has already been sent) and counted.
+    """
+
+    def __init__(self, voice_cache, workers=TTS_WORKERS, queue_size=TTS_QUEUE_SIZE):
+        self.voice_cache = voice_cache
+        self.workers = workers
+        self.queue_size = queue_size
+        self.stats = {"queued": 0, "sent": 0, "dropped": 0, "failed": 0, "max_depth": 0}
+        self._queue = None
+        self._executor = None
+        self._consumers = []
+
+    @property
+    def executor(self):
+        return self._executor
+
+    def saturated(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts")
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, message, text: str) -> bool:
+        """Queue a voice reply without waiting; returns False if it was dropped."""
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait((message, text))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("Antrean TTS penuh, pesan suara dilewati")
+            return False
+        self.stats["queued"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self._queue.qsize())
+        return True
+
+    async def _consume(self) -> None:
+        while True:
+            message, text = await self._queue.get()
+            try:
+                await self.voice_cache.send(message, text, self._executor)
+                self.stats["sent"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Kesalahan mengirim pesan suara: {e}")
+            finally:
+                self._queue.task_done()
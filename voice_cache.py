@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from telegram.error import BadRequest
+import startup
+
+logger = logging.getLogger(__name__)
+
+gtts = startup.lazy_import("gtts")
+
+VOICE_CACHE_DIR = os.getenv("VOICE_CACHE_DIR", "voice_cache")
+VOICE_CACHE_MAX_BYTES = int(os.getenv("VOICE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TTS_LANGUAGE = os.getenv("TTS_LANGUAGE", "id")
+FILE_ID_INDEX = "file_ids.db"
+LEGACY_FILE_ID_INDEX = "file_ids.json"
+EVICT_GRACE_SECONDS = 60  # file yang baru dirender/dipakai tidak digusur, mungkin sedang dikirim
+
+
+def voice_key(text: str, lang: str = TTS_LANGUAGE) -> str:
+    return hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+
+
+class VoiceCache:
+    """Content-addressed store of rendered TTS audio.
+
+    Audio is keyed by a hash of (language, text) and evicted least recently
+    used first once the directory grows past ``max_bytes``. After the first
+    upload the Telegram ``file_id`` is remembered (it stays valid after the
+    local file is evicted), so later replies with the same text send no audio
+    bytes at all. The file_id index is a SQLite table, so shard processes
+    sharing the directory add to it without overwriting each other.
+    """
+
+    def __init__(self, directory=VOICE_CACHE_DIR, max_bytes=VOICE_CACHE_MAX_BYTES, lang=TTS_LANGUAGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lang = lang
+        self.stats = {"file_id_hits": 0, "disk_hits": 0, "renders": 0, "evictions": 0}
+        self._lock = threading.Lock()  # koneksi indeks dipakai dari loop dan thread executor
+        self._db = None
+        self._file_ids = {}
+        self._rendering = {}
+
+    def open(self) -> None:
+        """Create the directory and load the file_id index (blocking); call once before use."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.directory, FILE_ID_INDEX), timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS file_ids (key TEXT PRIMARY KEY, file_id TEXT NOT NULL)")
+        self._import_legacy_index()
+        self._file_ids = dict(self._db.execute("SELECT key, file_id FROM file_ids"))
+
+    def _import_legacy_index(self) -> None:
+        path = os.path.join(self.directory, LEGACY_FILE_ID_INDEX)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding='utf-8') as f:
+                file_ids = json.load(f)
+            with self._db:
+                self._db.executemany("INSERT OR IGNORE INTO file_ids (key, file_id) VALUES (?, ?)", file_ids.items())
+            os.remove(path)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logger.error(f"Kesalahan memindahkan indeks file_id suara: {e}")
+
+    def _store_file_id(self, key: str, file_id) -> None:
+        """Write one index entry (``None`` deletes it); blocking, run it in an executor."""
+        with self._lock, self._db:
+            if file_id is None:
+                self._db.execute("DELETE FROM file_ids WHERE key = ?", (key,))
+            else:
+                self._db.execute("INSERT OR REPLACE INTO file_ids (key, file_id) VALUES (?, ?)", (key, file_id))
+
+    def lookup(self, key: str):
+        """Return the known file_id for ``key``, including ones recorded by other processes."""
+        file_id = self._file_ids.get(key)
+        if file_id is None:
+            with self._lock:
+                row = self._db.execute("SELECT file_id FROM file_ids WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                file_id = self._file_ids[key] = row[0]
+        return file_id
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.ogg")
+
+    def render(self, text: str) -> str:
+        """Return the cached audio path for ``text``, synthesizing it if needed (blocking)."""
+        key = voice_key(text, self.lang)
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+            self.stats["disk_hits"] += 1
+            return path
+        except FileNotFoundError:
+            pass  # belum pernah dirender, atau baru saja tergusur
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            gtts.gTTS(text=text, lang=self.lang).save(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.stats["renders"] += 1
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        """Delete least recently used audio past ``max_bytes``, sparing files used in the last minute."""
+        protected = time.time() - EVICT_GRACE_SECONDS
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".ogg"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # dihapus proses atau thread lain
+                total += stat.st_size
+                if stat.st_mtime < protected:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats["evictions"] += 1
+
+    async def render_async(self, text: str, executor=None) -> str:
+        """Render ``text`` in ``executor``; concurrent requests for the same text share one render."""
+        key = voice_key(text, self.lang)
+        pending = self._rendering.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(executor, self.render, text))
+            self._rendering[key] = pending
+            pending.add_done_callback(lambda _: self._rendering.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def prerender(self, texts, executor=None) -> None:
+        for text in texts:
+            if self.lookup(voice_key(text, self.lang)) is not None:
+                continue
+            try:
+                await self.render_async(text, executor)
+            except Exception as e:
+                logger.error(f"Kesalahan pra-render suara: {e}")
+
+    async def send(self, message, text: str, executor=None) -> None:
+        """Reply to ``message`` with ``text`` as voice, reusing a cached file_id when possible."""
+        key = voice_key(text, self.lang)
+        loop = asyncio.get_running_loop()
+        file_id = self.lookup(key)
+        if file_id is not None:
+            try:
+                await message.reply_voice(voice=file_id)
+                self.stats["file_id_hits"] += 1
+                return
+            except BadRequest as e:
+                logger.warning(f"file_id suara tidak berlaku lagi, mengunggah ulang: {e}")
+                self._file_ids.pop(key, None)
+                await loop.run_in_executor(executor, self._store_file_id, key, None)
+
+        voice = None
+        for _ in range(2):
+            path = await self.render_async(text, executor)
+            try:
+                voice = open(path, 'rb')  # setelah terbuka, penghapusan file tidak lagi mengganggu
+                break
+            except FileNotFoundError:
+                logger.debug(f"Berkas suara {key} tergusur sebelum dikirim, dirender ulang")
+        if voice is None:
+            raise FileNotFoundError(path)
+        with voice:
+            sent = await message.reply_voice(voice=voice)
+        if sent is not None and sent.voice is not None:
+            self._file_ids[key] = sent.voice.file_id
+            await loop.run_in_executor(executor, self._store_file_id, key, sent.voice.file_id)
@@ -0,0 +1,183 @@
+"""Webhook front end for the bots, as a plain ASGI app served by uvicorn.
+
+    BOT_MODE=webhook WEBHOOK_URL=https://bot.example.com/telegram WEBHOOK_SECRET=... python app.py
+
+Replay recorded updates against a local instance:
+
+    python webhook.py post update.json [http://127.0.0.1:8443/telegram]
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+from dotenv import load_dotenv
+from telegram import Bot, Update
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+# Lebih dari satu worker dijalankan sebagai shard (lihat sharding.shard_count), bukan worker uvicorn.
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+WEBHOOK_MAX_BODY = 1 << 20  # 1 MiB, jauh di atas ukuran pembaruan Telegram
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+
+async def start_application(application) -> None:
+    """Bring an Application up the way ``run_polling`` does, minus the updater."""
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+
+
+async def stop_application(application) -> None:
+    if application.running:
+        await application.stop()
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+class WebhookApp:
+    """ASGI app that feeds Telegram webhook POSTs into an Application's update queue.
+
+    ``build_application`` is called once at lifespan startup, and the Application is started exactly as ``run_polling`` would
+    (``post_init`` and ``post_shutdown`` included), just without an updater.
+    A request is answered as soon as its update is queued; handlers run
+    afterwards through the usual pipeline.
+    """
+
+    def __init__(self, build_application, secret_token=WEBHOOK_SECRET, path=WEBHOOK_PATH,
+                 max_body=WEBHOOK_MAX_BODY):
+        self.build_application = build_application
+        self.secret_token = secret_token.encode() if secret_token else None
+        self.path = path
+        self.max_body = max_body
+        self.application = None
+        self.stats = {"accepted": 0, "forbidden": 0, "invalid": 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            status = await self._handle(scope, receive)
+            await send({"type": "http.response.start", "status": status,
+                        "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": str(status).encode()})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.exception("Gagal memulai aplikasi webhook")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @property
+    def ready(self) -> bool:
+        return self.application is not None and self.application.running
+
+    async def startup(self) -> None:
+        self.application = self.build_application()
+        await start_application(self.application)
+        logger.info(f"Webhook siap di {self.path} (pid {os.getpid()})")
+
+    async def shutdown(self) -> None:
+        if self.application is not None:
+            await stop_application(self.application)
+        logger.info(f"Statistik webhook: {self.stats}")
+
+    async def enqueue(self, data: dict) -> bool:
+        update = Update.de_json(data, self.application.bot)
+        if update is None:
+            return False
+        await self.application.update_queue.put(update)
+        return True
+
+    async def _handle(self, scope, receive) -> int:
+        if scope["path"] == "/healthz":
+            return 200 if self.ready else 503
+        if scope["path"] != self.path:
+            return 404
+        if scope["method"] != "POST":
+            return 405
+        if self.secret_token is not None:
+            supplied = dict(scope["headers"]).get(SECRET_HEADER, b"")
+            if not hmac.compare_digest(supplied, self.secret_token):
+                self.stats["forbidden"] += 1
+                return 403
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) > self.max_body:
+                self.stats["invalid"] += 1
+                return 413
+        try:
+            accepted = await self.enqueue(json.loads(body))
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Pembaruan webhook tidak valid: {e}")
+            accepted = False
+        if not accepted:
+            self.stats["invalid"] += 1
+            return 400
+        self.stats["accepted"] += 1
+        return 200
+
+
+async def register_webhook(token: str, url: str = WEBHOOK_URL, secret_token: str = WEBHOOK_SECRET) -> None:
+    """Point Telegram at ``url``; done once by the parent, not by every worker."""
+    async with Bot(token) as bot:
+        await bot.set_webhook(url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+    logger.info(f"Webhook terdaftar ke {url}")
+
+
+def serve(app: WebhookApp, token: str) -> None:
+    """Serve ``app`` under uvicorn in this process.
+
+    There is deliberately no uvicorn ``workers`` option. Independent worker
+    Applications would receive a chat's updates in any order and race on
+    its ``user_data``. Several processes go through
+    :class:`sharding.ShardedWebhookApp` instead, which routes each chat to
+    one shard.
+    """
+    import uvicorn
+
+    if not WEBHOOK_SECRET:
+        logger.warning("WEBHOOK_SECRET kosong; permintaan webhook tidak diverifikasi")
+    if WEBHOOK_URL:
+        asyncio.run(register_webhook(token))
+    uvicorn.run(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT, lifespan="on", log_level="info")
+
+
+if __name__ == "__main__":
+    import sys
+    import httpx
+
+    if len(sys.argv) < 3 or sys.argv[1] != "post":
+        sys.exit(__doc__)
+    target = sys.argv[3] if len(sys.argv) > 3 else f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+    with open(sys.argv[2], "r", encoding='utf-8') as f:
+        payload = json.load(f)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET} if WEBHOOK_SECRET else {}
+    for update in payload if isinstance(payload, list) else [payload]:
+        response = httpx.post(target, json=update, headers=headers)
+        print(update.get("update_id"), response.status_code)